@@ -10,4 +10,4 @@ sleep 1
 
 echo "PostgreSQL started"
 
-gunicorn -b 0.0.0.0:5000 manage:app
+gunicorn -b 0.0.0.0:5000 --worker-class gthread --threads "${GUNICORN_THREADS:-16}" manage:app
@@ -0,0 +1,68 @@
+"""Micro-benchmark for the per-request authorization check.
+
+Times what ``authorize`` runs for every request: ``get_principal`` followed
+by ``Principal.is_authorized``, with the principal cache disabled, so the
+principal is loaded by its single query, and enabled. It needs the test
+database of DATABASE_TEST_URL, whose tables it creates and drops.
+
+    python -m benchmarks.authorization
+"""
+import timeit
+
+from project import create_app, db
+from project.models import User, Group, Permission
+from project.principals import get_principal
+
+
+GROUPS = 5
+PERMISSIONS_PER_GROUP = 20
+REQUIRED_PERMISSIONS = ['CODE_0_0', 'CODE_2_5', 'CODE_4_19']
+REQUESTS = 2000
+
+
+def seed():
+    user = User(
+        first_name='Bench', last_name='User', email='bench@test.com',
+        password='benchmark')
+
+    for i in range(GROUPS):
+        group = Group(name='group-{}'.format(i))
+        for j in range(PERMISSIONS_PER_GROUP):
+            group.permissions.append(Permission(
+                code='CODE_{}_{}'.format(i, j), name='permission'))
+        user.groups.append(group)
+
+    db.session.add(user)
+    db.session.commit()
+
+    return user.id
+
+
+def check(user_id):
+    assert get_principal(user_id).is_authorized(REQUIRED_PERMISSIONS)
+    db.session.remove()
+
+
+def run():
+    app = create_app()
+    app.config.from_object('project.config.TestingConfig')
+
+    with app.app_context():
+        db.create_all()
+
+        try:
+            user_id = seed()
+
+            for name, cached in (('loaded', False), ('cached', True)):
+                app.config['PRINCIPAL_CACHE_ENABLED'] = cached
+                seconds = timeit.timeit(
+                    lambda: check(user_id), number=REQUESTS)
+                print('{:<8} {:>8.2f} us/request'.format(
+                    name, seconds / REQUESTS * 1000000))
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,64 @@
+"""Bytes and time per poll of the permissions listing with and without ETags.
+
+A client polls an unchanged /auth/permissions, sending back the last ETag it
+got. Each poll runs the real view, so the conditional one still reads the
+version stamp from the database before answering 304. It needs the test
+database of DATABASE_TEST_URL, whose tables it creates and drops.
+
+    python -m benchmarks.conditional_get
+"""
+import time
+
+from project import create_app, db
+from project.models import Permission
+
+
+PERMISSIONS = 200
+POLLS = 2000
+
+
+def seed():
+    for i in range(PERMISSIONS):
+        db.session.add(Permission(
+            code='CODE_{}'.format(i), name='Permission {}'.format(i)))
+
+    db.session.commit()
+
+
+def poll(client, conditional):
+    etag = None
+    sent = 0
+    started = time.perf_counter()
+
+    for _ in range(POLLS):
+        headers = {'If-None-Match': etag} if etag else {}
+        response = client.get('/auth/permissions', headers=headers)
+        if conditional:
+            etag = response.headers.get('ETag')
+        sent += len(response.get_data())
+
+    return sent / POLLS, (time.perf_counter() - started) / POLLS
+
+
+def run():
+    app = create_app()
+    app.config.from_object('project.config.TestingConfig')
+
+    with app.app_context():
+        db.create_all()
+
+        try:
+            seed()
+            client = app.test_client()
+
+            for name, conditional in (('before', False), ('after', True)):
+                size, seconds = poll(client, conditional)
+                print('{:<8} {:>8.0f} bytes/poll {:>8.2f} us/poll'.format(
+                    name, size, seconds * 1000000))
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    run()
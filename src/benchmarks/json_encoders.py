@@ -0,0 +1,83 @@
+"""Throughput of encoding a user listing with each JSON encoder.
+
+Transient users are serialized with UserSerializer once, outside of the
+measure, and only the encoding of the list as a response body is timed.
+Each encoder runs RUNS times; the median, the fastest run and the standard
+deviation are reported. Encoders whose package is not installed are
+skipped; no database is needed.
+
+    python -m benchmarks.json_encoders
+"""
+import datetime
+import statistics
+import timeit
+
+from flask import Flask
+
+from project.encoders import JSONEncoder
+from project.models import User
+from project.serializers import UserSerializer
+
+
+USERS = 10000
+RUNS = 30
+ENCODERS = (
+    'project.encoders.StdlibEncoder',
+    'project.encoders.OrjsonEncoder',
+)
+
+
+def create_app(encoder):
+    app = Flask(__name__)
+    app.config.from_object('project.config.ProductionConfig')
+    app.config['JSON_ENCODER'] = encoder
+    app.json_encoder = JSONEncoder
+    return app
+
+
+def build_users():
+    users = []
+
+    for i in range(USERS):
+        user = User(
+            first_name='First {}'.format(i),
+            last_name='Last {}'.format(i),
+            email='user{}@test.com'.format(i))
+        user.id = i
+        user.active = True
+        user.admin = False
+        user.created = datetime.datetime(2020, 1, 1, 12, 30, i % 60)
+        user.created_by = 0
+        user.hash = 'hash'
+        users.append(user)
+
+    return users
+
+
+def run():
+    data = UserSerializer.to_array(build_users())
+
+    for name in ENCODERS:
+        app = create_app(name)
+
+        with app.app_context():
+            from project.encoders import jsonify
+
+            try:
+                jsonify([])
+            except ImportError:
+                print('{:<36} not installed'.format(name))
+                continue
+
+            runs = timeit.repeat(
+                lambda: jsonify(data).get_data(), number=1, repeat=RUNS)
+            median = statistics.median(runs)
+            print(
+                '{:<36} median {:>6.1f} ms min {:>6.1f} ms stdev {:>5.1f} ms '
+                '{:>10.0f} users/s'.format(
+                    name, median * 1000, min(runs) * 1000,
+                    statistics.stdev(runs) * 1000, USERS / median))
+
+
+if __name__ == '__main__':
+    run()
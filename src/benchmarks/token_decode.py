@@ -0,0 +1,52 @@
+"""Throughput of TokenSerializer.decode with and without the token cache.
+
+    python -m benchmarks.token_decode
+"""
+import timeit
+
+from flask import Flask
+
+from project.models import User
+from project.serializers import TokenSerializer, InvalidToken
+
+
+DECODES = 20000
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object('project.config.ProductionConfig')
+    app.config['SECRET_KEY'] = 'benchmark-secret'
+    return app
+
+
+def decode_forged(token):
+    try:
+        TokenSerializer.decode(token)
+    except InvalidToken:
+        pass
+
+
+def run():
+    app = create_app()
+
+    with app.app_context():
+        user = User()
+        user.id = 1
+        user.admin = False
+        token = TokenSerializer.encode(user).decode()
+        forged = token[:-4] + 'AAAA'
+
+        for enabled in (False, True):
+            app.config['TOKEN_CACHE_ENABLED'] = enabled
+            for name, function, value in (
+                    ('valid', TokenSerializer.decode, token),
+                    ('forged', decode_forged, forged)):
+                seconds = timeit.timeit(
+                    lambda: function(value), number=DECODES)
+                print('cache={:<6} {:<7} {:>10.0f} decodes/s'.format(
+                    str(enabled), name, DECODES / seconds))
+
+
+if __name__ == '__main__':
+    run()
@@ -83,6 +83,40 @@ def seed_db():
     db.session.commit()
 
 
+@cli.command()
+def purge_refresh_tokens():
+    """Deletes expired refresh tokens."""
+    import datetime
+    from project.models import RefreshToken
+
+    deleted = RefreshToken.query.filter(
+        RefreshToken.expires <= datetime.datetime.utcnow()).delete()
+    db.session.commit()
+
+    print('{} expired refresh tokens deleted'.format(deleted))
+
+
+@cli.command()
+@click.option(
+    '--algorithm', type=click.Choice(['argon2', 'bcrypt']), default='argon2')
+@click.option('--target-ms', default=250)
+@click.option('--memory-kib', default=65536)
+@click.option('--parallelism', default=1)
+def calibrate_hasher(algorithm, target_ms, memory_kib, parallelism):
+    """Finds password hasher parameters for a target verify latency."""
+    from project.hashing import calibrate_argon2, calibrate_bcrypt
+
+    if algorithm == 'bcrypt':
+        parameters, seconds = calibrate_bcrypt(target_ms / 1000)
+    else:
+        parameters, seconds = calibrate_argon2(
+            target_ms / 1000, memory_kib, parallelism)
+
+    print('verify takes {:.0f} ms with:'.format(seconds * 1000))
+    for name, value in parameters.items():
+        print('{}={}'.format(name, value))
+
+
 @cli.command()
 @click.option('--file', default=None)
 def test(file):
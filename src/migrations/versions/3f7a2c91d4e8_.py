@@ -0,0 +1,33 @@
+"""add user search index
+
+Revision ID: 3f7a2c91d4e8
+Revises: 9b1d5e07a3c2
+Create Date: 2026-10-18 14:37:52.610284
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a2c91d4e8'
+down_revision = '9b1d5e07a3c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public')
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public')
+    op.execute(
+        "CREATE OR REPLACE FUNCTION users.immutable_unaccent(text) "
+        "RETURNS text AS $$ SELECT public.unaccent('public.unaccent', $1) $$ "
+        "LANGUAGE sql IMMUTABLE STRICT")
+    op.execute(
+        "CREATE INDEX ix_users_users_search ON users.users USING gin "
+        "(users.immutable_unaccent(lower("
+        "first_name || ' ' || last_name || ' ' || email)) gin_trgm_ops)")
+
+
+def downgrade():
+    op.drop_index('ix_users_users_search', table_name='users', schema='users')
+    op.execute('DROP FUNCTION users.immutable_unaccent(text)')
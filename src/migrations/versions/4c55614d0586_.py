@@ -0,0 +1,24 @@
+"""add users permissions version
+
+Revision ID: 4c55614d0586
+Revises: ede6c8c1307e
+Create Date: 2026-10-18 10:12:31.402114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c55614d0586'
+down_revision = 'ede6c8c1307e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('permissions_version', sa.Integer(), server_default='0', nullable=False), schema='users')
+
+
+def downgrade():
+    op.drop_column('users', 'permissions_version', schema='users')
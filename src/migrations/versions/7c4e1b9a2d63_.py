@@ -0,0 +1,53 @@
+"""maintain change counters with triggers
+
+Revision ID: 7c4e1b9a2d63
+Revises: e3f5a9d7c614
+Create Date: 2026-10-19 10:21:37.402815
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e1b9a2d63'
+down_revision = 'e3f5a9d7c614'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = (
+    ('permissions', 'INSERT OR UPDATE OR DELETE OR TRUNCATE', 'permissions'),
+    ('groups', 'INSERT OR UPDATE OR DELETE OR TRUNCATE', 'groups'),
+    ('groups', 'DELETE OR TRUNCATE', 'group_permissions'),
+    ('group_permissions', 'INSERT OR UPDATE OR DELETE OR TRUNCATE',
+     'group_permissions'),
+)
+
+
+def upgrade():
+    op.execute(
+        "CREATE OR REPLACE FUNCTION users.touch_change_counters() "
+        "RETURNS trigger AS $$ "
+        "DECLARE counter text; "
+        "BEGIN "
+        "FOREACH counter IN ARRAY TG_ARGV LOOP "
+        "INSERT INTO users.change_counters (name, version) "
+        "VALUES (counter, 1) ON CONFLICT (name) DO UPDATE "
+        "SET version = users.change_counters.version + 1; "
+        "END LOOP; "
+        "RETURN NULL; "
+        "END $$ LANGUAGE plpgsql")
+
+    for table, events, counter in TRIGGERS:
+        op.execute(
+            "CREATE TRIGGER touch_{counter}_counter AFTER {events} "
+            "ON users.{table} FOR EACH STATEMENT "
+            "EXECUTE PROCEDURE users.touch_change_counters('{counter}')"
+            .format(table=table, events=events, counter=counter))
+
+
+def downgrade():
+    for table, events, counter in TRIGGERS:
+        op.execute('DROP TRIGGER touch_{}_counter ON users.{}'.format(
+            counter, table))
+
+    op.execute('DROP FUNCTION users.touch_change_counters()')
@@ -0,0 +1,31 @@
+"""add user listing indexes
+
+Revision ID: 9b1d5e07a3c2
+Revises: e50959b0c0b6
+Create Date: 2026-10-18 13:21:09.402117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1d5e07a3c2'
+down_revision = 'e50959b0c0b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_users_active_id', 'users', ['active', 'id'], unique=False, schema='users')
+    op.create_index('ix_users_users_admin_id', 'users', ['admin', 'id'], unique=False, schema='users')
+    op.create_index('ix_users_users_created_id', 'users', ['created', 'id'], unique=False, schema='users')
+    op.create_index('ix_users_users_last_name_id', 'users', ['last_name', 'id'], unique=False, schema='users')
+    op.create_index('ix_users_users_expiration', 'users', ['expiration'], unique=False, schema='users')
+
+
+def downgrade():
+    op.drop_index('ix_users_users_expiration', table_name='users', schema='users')
+    op.drop_index('ix_users_users_last_name_id', table_name='users', schema='users')
+    op.drop_index('ix_users_users_created_id', table_name='users', schema='users')
+    op.drop_index('ix_users_users_admin_id', table_name='users', schema='users')
+    op.drop_index('ix_users_users_active_id', table_name='users', schema='users')
@@ -0,0 +1,29 @@
+"""add change counters
+
+Revision ID: a6d0e3b58f14
+Revises: 3f7a2c91d4e8
+Create Date: 2026-10-18 15:12:04.873561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d0e3b58f14'
+down_revision = '3f7a2c91d4e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_counters',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name'),
+    schema='users'
+    )
+
+
+def downgrade():
+    op.drop_table('change_counters', schema='users')
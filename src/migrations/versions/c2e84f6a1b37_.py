@@ -0,0 +1,24 @@
+"""add user status index
+
+Revision ID: c2e84f6a1b37
+Revises: a6d0e3b58f14
+Create Date: 2026-10-18 16:05:41.228906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e84f6a1b37'
+down_revision = 'a6d0e3b58f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_users_status', 'users', ['expiration', 'id'], unique=False, schema='users', postgresql_where=sa.text('active IS true'))
+
+
+def downgrade():
+    op.drop_index('ix_users_users_status', table_name='users', schema='users')
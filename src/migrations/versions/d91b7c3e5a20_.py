@@ -0,0 +1,36 @@
+"""add hot path indexes
+
+Revision ID: d91b7c3e5a20
+Revises: c2e84f6a1b37
+Create Date: 2026-10-18 17:20:13.554017
+
+See db/query_plans.md for the plans each index is for.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b7c3e5a20'
+down_revision = 'c2e84f6a1b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_group_users_user_id', 'group_users', ['user_id', 'group_id'], unique=False, schema='users')
+    op.create_index('ix_users_group_permissions_permission_id', 'group_permissions', ['permission_id', 'group_id'], unique=False, schema='users')
+    op.create_index('ix_users_users_lower_email', 'users', [sa.text('lower(email)')], unique=False, schema='users')
+    op.create_index('ix_users_users_admins', 'users', ['id'], unique=False, schema='users', postgresql_where=sa.text('admin'))
+    op.drop_index('ix_users_users_admin_id', table_name='users', schema='users')
+    op.create_index('ix_users_users_updated_id', 'users', ['updated', 'id'], unique=False, schema='users')
+
+
+def downgrade():
+    op.drop_index('ix_users_users_updated_id', table_name='users', schema='users')
+    op.create_index('ix_users_users_admin_id', 'users', ['admin', 'id'], unique=False, schema='users')
+    op.drop_index('ix_users_users_admins', table_name='users', schema='users')
+    op.drop_index('ix_users_users_lower_email', table_name='users', schema='users')
+    op.drop_index('ix_users_group_permissions_permission_id', table_name='group_permissions', schema='users')
+    op.drop_index('ix_users_group_users_user_id', table_name='group_users', schema='users')
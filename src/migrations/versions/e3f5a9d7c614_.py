@@ -0,0 +1,39 @@
+"""make user emails case insensitive
+
+Revision ID: e3f5a9d7c614
+Revises: d91b7c3e5a20
+Create Date: 2026-10-18 18:02:36.940175
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f5a9d7c614'
+down_revision = 'd91b7c3e5a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    duplicates = connection.execute(sa.text(
+        'SELECT lower(email) FROM users.users '
+        'GROUP BY lower(email) HAVING count(*) > 1')).fetchall()
+
+    if duplicates:
+        raise RuntimeError(
+            'emails differing only in case must be merged first: {}'.format(
+                ', '.join(email for email, in duplicates)))
+
+    op.execute(
+        'UPDATE users.users SET email = lower(email) '
+        'WHERE email <> lower(email)')
+    op.drop_index('ix_users_users_lower_email', table_name='users', schema='users')
+    op.create_index('ix_users_users_lower_email', 'users', [sa.text('lower(email)')], unique=True, schema='users')
+
+
+def downgrade():
+    op.drop_index('ix_users_users_lower_email', table_name='users', schema='users')
+    op.create_index('ix_users_users_lower_email', 'users', [sa.text('lower(email)')], unique=False, schema='users')
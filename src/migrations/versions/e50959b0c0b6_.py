@@ -0,0 +1,38 @@
+"""add refresh tokens
+
+Revision ID: e50959b0c0b6
+Revises: 4c55614d0586
+Create Date: 2026-10-18 11:02:47.118530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e50959b0c0b6'
+down_revision = '4c55614d0586'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('expires', sa.DateTime(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash'),
+    schema='users'
+    )
+    op.create_index(op.f('ix_users_refresh_tokens_expires'), 'refresh_tokens', ['expires'], unique=False, schema='users')
+    op.create_index(op.f('ix_users_refresh_tokens_user_id'), 'refresh_tokens', ['user_id'], unique=False, schema='users')
+
+
+def downgrade():
+    op.drop_index(op.f('ix_users_refresh_tokens_user_id'), table_name='refresh_tokens', schema='users')
+    op.drop_index(op.f('ix_users_refresh_tokens_expires'), table_name='refresh_tokens', schema='users')
+    op.drop_table('refresh_tokens', schema='users')
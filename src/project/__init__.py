@@ -1,4 +1,5 @@
 import os
+import math
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
@@ -25,10 +26,40 @@ def register_blueprints(app):
     app.register_blueprint(auth_blueprint)
 
 
+def register_error_handlers(app):
+    from project.hashing import HashingSaturated
+    from project.throttling import LoginThrottled
+    from project.views.utils import failed_response
+
+    @app.errorhandler(HashingSaturated)
+    def hashing_saturated(e):
+        response, status_code = failed_response(
+            message='service busy, try again later.', status_code=503)
+        response.headers['Retry-After'] = str(
+            app.config.get('HASHING_RETRY_AFTER_SECONDS'))
+        return response, status_code
+
+    @app.errorhandler(LoginThrottled)
+    def login_throttled(e):
+        response, status_code = failed_response(
+            message='too many login attempts.', status_code=429)
+        response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+        return response, status_code
+
+
+def register_after_request_handlers(app):
+    from project.compression import compress_response
+
+    app.after_request(compress_response)
+
+
 def create_app(script_info=None):
+    from project.encoders import JSONEncoder
+
     app = Flask(__name__)
+    app.json_encoder = JSONEncoder
 
-    CORS(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'ETag'])
 
     app_settings = os.getenv('APP_SETTINGS')
     app.config.from_object(app_settings)
@@ -38,6 +69,8 @@ def create_app(script_info=None):
     bcrypt.init_app(app)
 
     register_blueprints(app)
+    register_error_handlers(app)
+    register_after_request_handlers(app)
 
     @app.shell_context_processor
     def ctx():
@@ -1,6 +1,7 @@
 from functools import wraps
-from flask import request, jsonify
-from project.models import User
+from flask import request
+from project.encoders import jsonify
+from project.principals import Principal, resolve_principal
 from project.serializers import TokenSerializer, InvalidToken, ExpiredToken
 
 
@@ -34,13 +35,13 @@ def do_authentication():
 
     try:
         payload = TokenSerializer.decode(token)
-        user = User.query.filter_by(id=payload['sub']).first()
+        principal = resolve_principal(payload)
 
-        if user is None or user.active is False:
+        if principal is None or principal.active is False:
             return forbidden()
 
-        if user:
-            return user
+        if principal:
+            return principal
     except InvalidToken:
         return unauthorized('invalid token.')
     except ExpiredToken:
@@ -53,7 +54,7 @@ def authenticate(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         response = do_authentication()
-        if isinstance(response, User):
+        if isinstance(response, Principal):
             return f(response, *args, **kwargs)
         return response
     return decorated_function
@@ -64,7 +65,7 @@ def authorize(required_permissions=[]):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             response = do_authentication()
-            if isinstance(response, User):
+            if isinstance(response, Principal):
                 if response.is_authorized(required_permissions):
                     return f(response, *args, **kwargs)
                 return forbidden()
@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TTLCache:
+    """Bounded, thread safe LRU cache whose entries expire after ttl seconds.
+
+    Keeps hit, miss, eviction and expiration counters, exposed by stats().
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+
+            if expires_at <= self.clock():
+                del self.__entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+
+        with self.__lock:
+            self.__entries[key] = (value, self.clock() + ttl)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.__lock:
+            if self.__entries.pop(key, None) is None:
+                return False
+
+            self.invalidations += 1
+            return True
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def get_app_cache(name, max_size, ttl):
+    cache = current_app.extensions.get(name)
+
+    if cache is None:
+        cache = TTLCache(max_size=max_size, ttl=ttl)
+        current_app.extensions[name] = cache
+
+    return cache
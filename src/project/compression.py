@@ -0,0 +1,139 @@
+import zlib
+
+from flask import current_app, request
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.__compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self.__compressor.compress(data) + self.__compressor.flush(
+            zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.__compressor.flush()
+
+    @staticmethod
+    def level(config):
+        return config.get('COMPRESSION_GZIP_LEVEL')
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, level):
+        import brotli
+
+        self.__compressor = brotli.Compressor(quality=level)
+
+    def process(self, data):
+        return self.__compressor.process(data) + self.__compressor.flush()
+
+    def finish(self):
+        return self.__compressor.finish()
+
+    @staticmethod
+    def level(config):
+        return config.get('COMPRESSION_BROTLI_QUALITY')
+
+    @staticmethod
+    def available():
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            return False
+
+        return True
+
+
+def get_encoders():
+    """Returns the encoders by preference, brotli only when installed."""
+    encoders = current_app.extensions.get('compression_encoders')
+
+    if encoders is None:
+        encoders = [GzipEncoder]
+
+        if BrotliEncoder.available():
+            encoders.insert(0, BrotliEncoder)
+
+        current_app.extensions['compression_encoders'] = encoders
+
+    return encoders
+
+
+def encoded_etags(etag):
+    """Returns etag and the tags of its compressed representations."""
+    return [etag] + [
+        '{}-{}'.format(etag, encoder.name) for encoder in get_encoders()]
+
+
+def negotiate_encoder():
+    encoders = {encoder.name: encoder for encoder in get_encoders()}
+    name = request.accept_encodings.best_match(list(encoders))
+
+    return encoders.get(name)
+
+
+def compressible(response):
+    config = current_app.config
+
+    return config.get('COMPRESSION_ENABLED') \
+        and response.status_code == 200 \
+        and response.mimetype in config.get('COMPRESSION_MIMETYPES') \
+        and 'Content-Encoding' not in response.headers
+
+
+def compress_stream(chunks, encoder):
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+
+        data = encoder.process(chunk)
+
+        if data:
+            yield data
+
+    yield encoder.finish()
+
+
+def compress_response(response):
+    """Compresses JSON and NDJSON bodies with the best encoding the client
+    accepts.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE are sent as they are. Streamed
+    bodies are always compressed, chunk by chunk, since their size is not
+    known upfront. Compressed representations get their own ETag so caches
+    never mix them up with the identity one.
+    """
+    if not compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoder_class = negotiate_encoder()
+
+    if encoder_class is None:
+        return response
+
+    if not response.is_streamed and len(response.get_data()) \
+            < current_app.config.get('COMPRESSION_MIN_SIZE'):
+        return response
+
+    encoder = encoder_class(encoder_class.level(current_app.config))
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoder)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(
+            encoder.process(response.get_data()) + encoder.finish())
+
+    response.headers['Content-Encoding'] = encoder_class.name
+
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag('{}-{}'.format(etag, encoder_class.name), weak)
+
+    return response
@@ -6,16 +6,64 @@ class BaseConfig:
     TESTING = False
     DEBUG = True
     SECRET_KEY = os.environ.get('SECRET_KEY')
+    JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+    JWT_KEYS_PATH = os.environ.get('JWT_KEYS_PATH')
+    JWT_ACTIVE_KEY_ID = os.environ.get('JWT_ACTIVE_KEY_ID')
+    JWKS_MAX_AGE_SECONDS = 3600
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     MAILER_SERVICE_URL = os.environ.get('MAILER_SERVICE_URL')
     CHANGE_PASSWORD_URL = os.environ.get('CHANGE_PASSWORD_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     BCRYPT_LOG_ROUNDS = 13
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'bcrypt')
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 3))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 65536))
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+    HASHING_MAX_WORKERS = int(os.environ.get('HASHING_MAX_WORKERS', 2))
+    HASHING_MAX_QUEUE = int(os.environ.get('HASHING_MAX_QUEUE', 8))
+    HASHING_RETRY_AFTER_SECONDS = 1
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    LOGIN_THROTTLE_ENABLED = True
+    LOGIN_THROTTLE_STORE = 'project.throttling.MemoryBucketStore'
+    LOGIN_THROTTLE_IP_CAPACITY = 20
+    LOGIN_THROTTLE_IP_REFILL_SECONDS = 3
+    LOGIN_THROTTLE_EMAIL_CAPACITY = 5
+    LOGIN_THROTTLE_EMAIL_REFILL_SECONDS = 60
     TOKEN_EXPIRATION_DAYS = 30
     TOKEN_EXPIRATION_SECONDS = 0
     RECOVER_TOKEN_EXPIRATION_HOURS = 2
+    REFRESH_TOKENS_ENABLED = False
+    ACCESS_TOKEN_EXPIRATION_MINUTES = 15
+    REFRESH_TOKEN_EXPIRATION_DAYS = 30
     MAILER_SERVICE_MOCK = False
+    PRINCIPAL_CACHE_ENABLED = True
+    PRINCIPAL_CACHE_SIZE = 4096
+    PRINCIPAL_CACHE_TTL_SECONDS = 30
+    TOKEN_CACHE_ENABLED = True
+    TOKEN_CACHE_SIZE = 4096
+    TOKEN_CACHE_NEGATIVE_SIZE = 512
+    TOKEN_CACHE_NEGATIVE_TTL_SECONDS = 5
+    TOKEN_PERMISSION_CLAIMS = False
+    PERMISSION_INDEX_TTL_SECONDS = 60
+    PERMISSION_INDEX_MIN_REFRESH_SECONDS = 5
+    AUTHORIZE_BATCH_MAX_SIZE = 500
+    USERS_PAGE_MAX_LIMIT = 500
+    USERS_STREAM_CHUNK_SIZE = 500
+    USERS_SEARCH_MIN_LENGTH = 3
+    USERS_SEARCH_DEFAULT_LIMIT = 20
+    USERS_SEARCH_MAX_LIMIT = 100
+    USERS_SEARCH_MAX_CANDIDATES = 200
+    USERS_LOOKUP_MAX_SIZE = 1000
+    USERS_LOOKUP_CHUNK_SIZE = 500
+    JSON_ENCODER = os.environ.get(
+        'JSON_ENCODER', 'project.encoders.StdlibEncoder')
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIMETYPES = ('application/json', 'application/x-ndjson')
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(
+        os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
 
 
 class DevelopmentConfig(BaseConfig):
@@ -33,9 +81,13 @@ class TestingConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
     SQLALCHEMY_ECHO = False
     BCRYPT_LOG_ROUNDS = 4
+    ARGON2_TIME_COST = 1
+    ARGON2_MEMORY_COST = 1024
     TOKEN_EXPIRATION_DAYS = 0
     TOKEN_EXPIRATION_SECONDS = 3
     MAILER_SERVICE_MOCK = True
+    PRINCIPAL_CACHE_ENABLED = False
+    PERMISSION_INDEX_MIN_REFRESH_SECONDS = 0
 
 
 class StagingConfig(BaseConfig):
@@ -0,0 +1,77 @@
+import datetime
+
+import flask
+from flask import current_app, json
+from werkzeug.utils import import_string
+
+
+def encode_default(o):
+    """Renders dates as str() does, which is what the API always sent."""
+    if isinstance(o, datetime.date):
+        return str(o)
+
+    raise TypeError('{!r} is not JSON serializable'.format(o))
+
+
+class JSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, datetime.date):
+            return encode_default(o)
+
+        return super().default(o)
+
+
+class StdlibEncoder:
+    """Encodes with Flask's json module and the app's JSONEncoder.
+
+    dumps is compact, as jsonify is outside of debug, so streamed items are
+    encoded like the same items in a regular response.
+    """
+
+    def dumps(self, data):
+        return json.dumps(data, separators=(',', ':')).encode()
+
+    def jsonify(self, data):
+        return flask.jsonify(data)
+
+
+class OrjsonEncoder:
+    """Encodes with orjson, sorting keys as Flask does.
+
+    Output is UTF-8 rather than ASCII with escapes, and pretty printing does
+    not leave spaces at the end of lines, so only those differ from
+    StdlibEncoder.
+    """
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        self.options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, data, options=0):
+        return self.orjson.dumps(
+            data, default=encode_default, option=self.options | options)
+
+    def jsonify(self, data):
+        pretty = current_app.config.get('JSONIFY_PRETTYPRINT_REGULAR') \
+            or current_app.debug
+        options = self.orjson.OPT_INDENT_2 if pretty else 0
+
+        return current_app.response_class(
+            self.dumps(data, options) + b'\n',
+            mimetype=current_app.config.get('JSONIFY_MIMETYPE'))
+
+
+def get_json_encoder():
+    encoder = current_app.extensions.get('json_encoder')
+
+    if encoder is None:
+        encoder = import_string(current_app.config.get('JSON_ENCODER'))()
+        current_app.extensions['json_encoder'] = encoder
+
+    return encoder
+
+
+def jsonify(data):
+    return get_json_encoder().jsonify(data)
@@ -0,0 +1,218 @@
+import time
+import timeit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from project import bcrypt
+
+
+class HashingSaturated(Exception):
+    pass
+
+
+class HashingExecutor:
+    """Runs password hashing on a bounded thread pool.
+
+    At most max_workers hashes run at once and max_queue more may wait;
+    anything beyond that is rejected with HashingSaturated instead of
+    blocking the calling worker.
+
+    The limit is per process and only bites when the process serves
+    several requests at once. The service runs gunicorn gthread workers
+    with more threads than max_workers + max_queue, so that the extra
+    request threads are turned away while the others keep serving.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self.__slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='hashing')
+
+    def run(self, function, *args):
+        if not self.__slots.acquire(blocking=False):
+            with self.__lock:
+                self.rejected += 1
+            raise HashingSaturated
+
+        with self.__lock:
+            self.pending += 1
+
+        started = time.perf_counter()
+
+        try:
+            return self.__executor.submit(function, *args).result()
+        finally:
+            with self.__lock:
+                self.pending -= 1
+                self.completed += 1
+                self.seconds += time.perf_counter() - started
+            self.__slots.release()
+
+    def average_seconds(self):
+        return self.seconds / self.completed if self.completed else 0.0
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self.pending,
+            'queued': max(self.pending - self.max_workers, 0),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'seconds': round(self.seconds, 3),
+            'average_seconds': round(self.average_seconds(), 4),
+        }
+
+
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    executor = current_app.extensions.get('hashing_executor')
+
+    if executor is None:
+        with _executor_lock:
+            executor = current_app.extensions.get('hashing_executor')
+
+            if executor is None:
+                executor = HashingExecutor(
+                    max_workers=current_app.config.get('HASHING_MAX_WORKERS'),
+                    max_queue=current_app.config.get('HASHING_MAX_QUEUE'))
+                current_app.extensions['hashing_executor'] = executor
+
+    return executor
+
+
+class BcryptHasher:
+    algorithm = 'bcrypt'
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+
+    def identify(self, password_hash):
+        return password_hash.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def hash(self, password):
+        return bcrypt.generate_password_hash(password, self.rounds).decode()
+
+    def verify(self, password_hash, password):
+        return bcrypt.check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return int(password_hash.split('$')[2]) != self.rounds
+
+
+class Argon2Hasher:
+    algorithm = 'argon2'
+
+    def __init__(self, time_cost, memory_cost, parallelism):
+        from argon2 import PasswordHasher, Type
+
+        self.hasher = PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            type=Type.ID)
+
+    def identify(self, password_hash):
+        return password_hash.startswith('$argon2id$')
+
+    def hash(self, password):
+        return self.hasher.hash(password)
+
+    def verify(self, password_hash, password):
+        from argon2.exceptions import VerificationError, InvalidHash
+
+        try:
+            return self.hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHash):
+            return False
+
+    def needs_rehash(self, password_hash):
+        return self.hasher.check_needs_rehash(password_hash)
+
+
+def get_hashers():
+    """Returns the available hashers, the preferred one first."""
+    config = current_app.config
+    hashers = [
+        BcryptHasher(rounds=config.get('BCRYPT_LOG_ROUNDS')),
+        Argon2Hasher(
+            time_cost=config.get('ARGON2_TIME_COST'),
+            memory_cost=config.get('ARGON2_MEMORY_COST'),
+            parallelism=config.get('ARGON2_PARALLELISM')),
+    ]
+
+    return sorted(
+        hashers,
+        key=lambda hasher: hasher.algorithm != config.get('PASSWORD_HASHER'))
+
+
+def hash_password(password):
+    hasher = get_hashers()[0]
+
+    return get_hashing_executor().run(hasher.hash, password)
+
+
+def check_password(password_hash, password):
+    for hasher in get_hashers():
+        if hasher.identify(password_hash):
+            return get_hashing_executor().run(
+                hasher.verify, password_hash, password)
+
+    return False
+
+
+def needs_rehash(password_hash):
+    hasher = get_hashers()[0]
+
+    return not hasher.identify(password_hash) \
+        or hasher.needs_rehash(password_hash)
+
+
+def measure_verify(hasher, repeat=3):
+    password = 'calibration-password'
+    password_hash = hasher.hash(password)
+
+    return min(timeit.repeat(
+        lambda: hasher.verify(password_hash, password),
+        number=1,
+        repeat=repeat))
+
+
+def calibrate_bcrypt(target_seconds):
+    """Returns the lowest bcrypt rounds verifying in at least target."""
+    for rounds in range(4, 32):
+        seconds = measure_verify(BcryptHasher(rounds=rounds))
+
+        if seconds >= target_seconds:
+            break
+
+    return {'BCRYPT_LOG_ROUNDS': rounds}, seconds
+
+
+def calibrate_argon2(target_seconds, memory_cost, parallelism):
+    """Returns the lowest argon2 time cost verifying in at least target."""
+    for time_cost in range(1, 65):
+        seconds = measure_verify(Argon2Hasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism))
+
+        if seconds >= target_seconds:
+            break
+
+    return {
+        'ARGON2_TIME_COST': time_cost,
+        'ARGON2_MEMORY_COST': memory_cost,
+        'ARGON2_PARALLELISM': parallelism,
+    }, seconds
@@ -0,0 +1,84 @@
+import os
+import json
+
+from flask import current_app
+from jwt.algorithms import RSAAlgorithm
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+
+class UnknownKey(Exception):
+    pass
+
+
+class KeyRing:
+    """RSA signing keys by key id.
+
+    Keys are read from ``<kid>.pem`` files in JWT_KEYS_PATH. Tokens are
+    signed with JWT_ACTIVE_KEY_ID, and every key in the directory stays
+    published in the JWKS so tokens signed before a rotation still verify.
+    Without a path the ring is empty, so RS256 tokens are rejected.
+    """
+
+    ALGORITHM = 'RS256'
+
+    def __init__(self, private_keys, active_key_id):
+        self.private_keys = private_keys
+        self.active_key_id = active_key_id
+
+    @staticmethod
+    def load(path, active_key_id):
+        private_keys = {}
+
+        if not path:
+            return KeyRing(private_keys, active_key_id)
+
+        for filename in sorted(os.listdir(path)):
+            kid, extension = os.path.splitext(filename)
+
+            if extension != '.pem':
+                continue
+
+            with open(os.path.join(path, filename), 'rb') as key_file:
+                private_keys[kid] = serialization.load_pem_private_key(
+                    key_file.read(), password=None, backend=default_backend())
+
+        return KeyRing(private_keys, active_key_id)
+
+    def signing_key(self):
+        if self.active_key_id not in self.private_keys:
+            raise UnknownKey(self.active_key_id)
+
+        return self.active_key_id, self.private_keys[self.active_key_id]
+
+    def public_key(self, kid):
+        if kid not in self.private_keys:
+            raise UnknownKey(kid)
+
+        return self.private_keys[kid].public_key()
+
+    def jwks(self):
+        keys = []
+
+        for kid, private_key in self.private_keys.items():
+            jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+            jwk.update({'kid': kid, 'use': 'sig', 'alg': self.ALGORITHM})
+            keys.append(jwk)
+
+        return {'keys': keys}
+
+
+def get_key_ring():
+    key_ring = current_app.extensions.get('key_ring')
+
+    if key_ring is None:
+        key_ring = KeyRing.load(
+            current_app.config.get('JWT_KEYS_PATH'),
+            current_app.config.get('JWT_ACTIVE_KEY_ID'))
+        current_app.extensions['key_ring'] = key_ring
+
+    return key_ring
+
+
+def get_jwks():
+    return get_key_ring().jwks()
@@ -1,16 +1,30 @@
 import os
 import jwt
+import secrets
 import datetime
 
 from flask import current_app
+from sqlalchemy.orm import load_only, selectinload, undefer
 
 from project.validators.decorators import validate
 from project.serializers import (
-    UserSerializer, GroupSerializer, PermissionSerializer, TokenSerializer)
+    UserSerializer, GroupSerializer, PermissionSerializer, TokenSerializer,
+    InvalidToken, ExpiredToken)
 from project.validations import (
-    CreateUserValidator, UpdateUserValidator, LoginValidator)
-from project.models import User, Group, Permission
-from project import db, bcrypt
+    CreateUserValidator, UpdateUserValidator, LoginValidator,
+    RefreshValidator)
+from project.models import User, Group, Permission, RefreshToken
+from project.principals import (
+    get_principals, touch_principals, touch_group_principals,
+    invalidate_principals, invalidate_group_principals, group_member_ids)
+from project.permission_index import permission_mask
+from project.pagination import UserPage, in_group
+from project.search import UserSearch
+from project.lookup import UserLookup
+from project.validators.exceptions import ValidatorException
+from project import db
+from project.hashing import (
+    HashingSaturated, check_password, hash_password, needs_rehash)
 from mailer_service.factories import MailerServiceFactory
 
 
@@ -22,24 +36,87 @@ class Unauthorized(Exception):
     pass
 
 
+def serialized_users(query, fields=None):
+    """Loads only the columns UserSerializer reads for fields, and the
+    group ids in one extra query when group_id is one of them."""
+    query = query.options(load_only(*UserSerializer.columns(fields)))
+
+    if fields is None or 'group_id' in fields:
+        query = query.options(selectinload(User.groups).load_only(Group.id))
+
+    return query
+
+
+def get_user_page(args):
+    return UserPage(args, current_app.config.get('USERS_PAGE_MAX_LIMIT'))
+
+
+def get_user_fields(args):
+    if args is None:
+        return None
+
+    return UserSerializer.parse_fields(args.get('fields'))
+
+
+def list_users(query, args):
+    fields = get_user_fields(args)
+    users, next_cursor = get_user_page(args).fetch(
+        serialized_users(query, fields))
+
+    return UserSerializer.to_array(users, fields), next_cursor
+
+
+def stream_users(query, args):
+    """Serializes users as they are read from a server side cursor."""
+    fields = get_user_fields(args)
+    page = get_user_page(args)
+    query = page.order(serialized_users(query, fields))
+
+    if page.limit is not None:
+        query = query.limit(page.limit)
+
+    query = query.yield_per(current_app.config.get('USERS_STREAM_CHUNK_SIZE'))
+
+    return (UserSerializer.to_dict(user, fields) for user in query)
+
+
+def revoke_refresh_tokens(user_id):
+    RefreshToken.query.filter_by(user_id=user_id).delete()
+
+
 class UserLogics:
-    def list(self):
-        users = User.query.order_by(User.id.asc()).all()
+    def list(self, args):
+        return list_users(User.query, args)
 
-        return UserSerializer.to_array(users)
+    def stream(self, args):
+        return stream_users(User.query, args)
 
-    def list_admins(self):
-        users = User.query.filter_by(admin=True).order_by(User.id.asc())
+    def list_admins(self, args):
+        return list_users(User.query.filter_by(admin=True), args)
 
-        return UserSerializer.to_array(users)
+    def stream_admins(self, args):
+        return stream_users(User.query.filter_by(admin=True), args)
 
-    def get(self, id):
-        user = User.query.filter_by(id=id).first()
+    def search(self, args):
+        fields = get_user_fields(args)
+        users = UserSearch(
+            args,
+            current_app.config.get('USERS_SEARCH_MIN_LENGTH'),
+            current_app.config.get('USERS_SEARCH_DEFAULT_LIMIT'),
+            current_app.config.get('USERS_SEARCH_MAX_LIMIT'),
+            current_app.config.get('USERS_SEARCH_MAX_CANDIDATES')
+        ).fetch(serialized_users(User.query, fields))
+
+        return UserSerializer.to_array(users, fields)
+
+    def get(self, id, args=None):
+        fields = get_user_fields(args)
+        user = serialized_users(User.query, fields).filter_by(id=id).first()
 
         if not user:
             raise NotFound
 
-        return UserSerializer.to_dict(user)
+        return UserSerializer.to_dict(user, fields)
 
     @validate(CreateUserValidator)
     def create(self, data, user):
@@ -94,8 +171,11 @@ class UserLogics:
         del data['group_id']
 
         User.query.filter_by(id=id).update(data)
+        touch_principals(id)
         db.session.commit()
 
+        invalidate_principals(id)
+
         return self.get(id)
 
     def deactivate(self, id, updated_by):
@@ -103,8 +183,12 @@ class UserLogics:
             'active': False,
             'updated_by': updated_by.id
         })
+        touch_principals(id)
+        revoke_refresh_tokens(id)
         db.session.commit()
 
+        invalidate_principals(id)
+
         return self.get(id)
 
     def activate(self, id, updated_by):
@@ -112,14 +196,35 @@ class UserLogics:
             'active': True,
             'updated_by': updated_by.id
         })
+        touch_principals(id)
         db.session.commit()
 
-        return self.get(id)
+        invalidate_principals(id)
 
-    def filter_by_ids(self, ids):
-        users = User.query.filter(User.id.in_(ids)).order_by(User.id.asc())
+        return self.get(id)
 
-        return UserSerializer.to_array(users)
+    def filter_by_ids(self, ids, args=None):
+        fields = get_user_fields(args)
+        users = serialized_users(
+            User.query.filter(User.id.in_(ids)).order_by(User.id.asc()),
+            fields)
+
+        return UserSerializer.to_array(users, fields)
+
+    def lookup(self, data, args=None):
+        fields = get_user_fields(args)
+        lookup = UserLookup(
+            data,
+            current_app.config.get('USERS_LOOKUP_MAX_SIZE'),
+            current_app.config.get('USERS_LOOKUP_CHUNK_SIZE'))
+        query = serialized_users(User.query, fields).options(
+            undefer(User.email))
+
+        return [
+            {key: value, 'user': (
+                UserSerializer.to_dict(user, fields) if user else None)}
+            for key, value, user in lookup.fetch(query)
+        ]
 
     def change_password(self, user_data, id, user):
         user = User.query.filter_by(id=id).first()
@@ -132,8 +237,11 @@ class UserLogics:
             password=user_data['password'])
 
         db.session.add(user)
+        revoke_refresh_tokens(user.id)
         db.session.commit()
 
+        invalidate_principals(user.id)
+
     def __add_user_to_group(self, user_id, group_id):
         user = User.query.filter_by(id=user_id).first()
         group = Group.query.filter_by(id=group_id).first()
@@ -149,8 +257,11 @@ class UserLogics:
         user.groups.append(group)
 
         db.session.add(user)
+        touch_principals(user.id)
         db.session.commit()
 
+        invalidate_principals(user.id)
+
 
 class GroupLogics:
     def get(self, id):
@@ -182,14 +293,19 @@ class GroupLogics:
 
     def delete(self, id):
         group = Group.query.filter_by(id=id).first()
+        member_ids = group_member_ids(id)
 
+        touch_group_principals(id)
         db.session.delete(group)
         db.session.commit()
 
-    def users(self, id):
-        users = Group.query.filter_by(id=id).first().users
+        invalidate_principals(*member_ids)
+
+    def users(self, id, args):
+        return list_users(User.query.filter(in_group(id)), args)
 
-        return UserSerializer.to_array(users)
+    def stream_users(self, id, args):
+        return stream_users(User.query.filter(in_group(id)), args)
 
     def add_user(self, data, id):
         group = Group.query.filter_by(id=id).first()
@@ -198,8 +314,11 @@ class GroupLogics:
         group.users.append(user)
 
         db.session.add(group)
+        touch_principals(user.id)
         db.session.commit()
 
+        invalidate_principals(user.id)
+
         return UserSerializer.to_array(group.users)
 
     def delete_user(self, user_id, id):
@@ -209,8 +328,11 @@ class GroupLogics:
         group.users.remove(user)
 
         db.session.add(group)
+        touch_principals(user.id)
         db.session.commit()
 
+        invalidate_principals(user.id)
+
         return UserSerializer.to_array(group.users)
 
     def permissions(self, id):
@@ -225,8 +347,11 @@ class GroupLogics:
         group.permissions.append(permission)
 
         db.session.add(group)
+        touch_group_principals(id)
         db.session.commit()
 
+        invalidate_group_principals(id)
+
         return PermissionSerializer.to_array(group.permissions)
 
     def delete_permission(self, code, id):
@@ -236,8 +361,11 @@ class GroupLogics:
         group.permissions.remove(permission)
 
         db.session.add(group)
+        touch_group_principals(id)
         db.session.commit()
 
+        invalidate_group_principals(id)
+
         return PermissionSerializer.to_array(group.permissions)
 
 
@@ -254,36 +382,155 @@ class AuthLogics:
 
     @validate(LoginValidator)
     def login(self, data):
-        user = User.query.filter_by(
-            email=data['email'].lower(), active=True).first()
+        user = User.query.options(undefer(User.password)).filter(
+            User.has_email(data['email']), User.active.is_(True)).first()
 
         if not user:
             raise NotFound
 
         password = data['password']
-        if bcrypt.check_password_hash(user.password, password) is False:
+        if check_password(user.password, password) is False:
             return False
 
-        return TokenSerializer.encode(user).decode()
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except HashingSaturated:
+                # The upgrade is opportunistic and is retried on next login
+                pass
+
+        return self.__issue_tokens(user)
+
+    @validate(RefreshValidator)
+    def refresh(self, data):
+        """Rotates a refresh token.
+
+        The token is consumed by a single DELETE ... RETURNING, so when
+        concurrent requests carry the same token only one of them gets its
+        row back and the others are unauthorized.
+        """
+        tokens = RefreshToken.__table__
+        consumed = db.session.execute(tokens.delete().where(
+            tokens.c.token_hash == RefreshToken.hash(data['refresh_token'])
+        ).returning(tokens.c.user_id, tokens.c.expires)).first()
+
+        if consumed is None:
+            raise Unauthorized
+
+        user_id, expires = consumed
+        user = User.query.filter_by(id=user_id).first()
+
+        if expires <= datetime.datetime.utcnow() or user.active is False:
+            db.session.commit()
+            raise Unauthorized
+
+        return self.__issue_tokens(user)
+
+    def __issue_tokens(self, user):
+        token = TokenSerializer.encode(user).decode()
+
+        if not current_app.config.get('REFRESH_TOKENS_ENABLED'):
+            return token
+
+        refresh_token = secrets.token_urlsafe(32)
+
+        db.session.add(RefreshToken(
+            user_id=user.id,
+            token_hash=RefreshToken.hash(refresh_token),
+            expires=datetime.datetime.utcnow() + datetime.timedelta(
+                days=current_app.config.get('REFRESH_TOKEN_EXPIRATION_DAYS'))
+        ))
+        db.session.commit()
+
+        return {'token': token, 'refresh_token': refresh_token}
+
+    def get_status(self, principal):
+        user = serialized_users(User.query).filter_by(
+            id=principal.id).first()
 
-    def get_status(self, user):
         serialized_user = UserSerializer.to_dict(user)
-        serialized_user['permissions'] = user.permissions
+        serialized_user['permissions'] = principal.permissions
 
         return serialized_user
 
+    def authorize(self, checks):
+        max_size = current_app.config.get('AUTHORIZE_BATCH_MAX_SIZE')
+
+        if not isinstance(checks, list) or len(checks) > max_size:
+            raise ValidatorException({
+                'checks': 'must be a list of at most {} checks.'.format(
+                    max_size)})
+
+        user_ids = [self.__get_check_user_id(check) for check in checks]
+        principals = get_principals(
+            set(user_id for user_id in user_ids if user_id is not None))
+        masks = {}
+        results = []
+
+        for check, user_id in zip(checks, user_ids):
+            codes = tuple(check['permissions'])
+
+            if codes not in masks:
+                masks[codes] = permission_mask(codes)
+
+            principal = principals.get(user_id)
+            authorized = principal is not None \
+                and principal.active is True \
+                and masks[codes] is not None \
+                and principal.has_permission_mask(masks[codes])
+
+            results.append({'user_id': user_id, 'authorized': authorized})
+
+        return results
+
+    def __get_check_user_id(self, check):
+        if not isinstance(check, dict) \
+                or not isinstance(check.get('permissions'), list) \
+                or not all(isinstance(code, str)
+                           for code in check['permissions']):
+            raise ValidatorException({
+                'permissions': 'permissions is required.'})
+
+        if 'token' in check:
+            return self.__get_token_user_id(check['token'])
+
+        user_id = check.get('user_id')
+
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            raise ValidatorException({
+                'user_id': 'user id or token is required.'})
+
+        return user_id
+
+    def __get_token_user_id(self, token):
+        if not isinstance(token, str):
+            raise ValidatorException({'token': 'token must be a string.'})
+
+        try:
+            user_id = TokenSerializer.decode(token).get('sub')
+        except (InvalidToken, ExpiredToken):
+            return None
+
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            raise ValidatorException({
+                'token': 'token is not an access token.'})
+
+        return user_id
+
     def recover_password(self, email):
-        user = User.query.filter_by(email=email, active=True).first()
+        user = User.query.filter(
+            User.has_email(email), User.active.is_(True)).first()
 
         if not user or (
                 user.expiration and user.expiration <= datetime.date.today()):
             raise NotFound
         service = MailerServiceFactory.get_instance()
-        email_to = [email]
+        email_to = [user.email]
         email_from = self.EMAIL_FROM
         email_subject = self.EMAIL_SUBJECT
         email_body = self.__create_recover_password_email(
-            email, user.full_name)
+            user.email, user.full_name)
 
         service.send(
             recipients=email_to,
@@ -299,13 +546,17 @@ class AuthLogics:
 
         email = token_data['sub']
 
-        user = User.query.filter_by(email=email, active=True).first()
+        user = User.query.filter(
+            User.has_email(email), User.active.is_(True)).first()
         user.password = user.generate_password_hash(
             password=password)
 
         db.session.add(user)
+        revoke_refresh_tokens(user.id)
         db.session.commit()
 
+        invalidate_principals(user.id)
+
     def __create_recover_password_email(self, email, name):
         token = self.__generate_token(email)
         recover_url = current_app.config.get('CHANGE_PASSWORD_URL')
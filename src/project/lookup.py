@@ -0,0 +1,83 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import array
+
+from project.models import User
+from project.validators.exceptions import ValidatorException
+
+
+class UserLookup:
+    """Bulk lookup of users by id and email, in request order.
+
+    The payload is a list of ids, or an object with ids and emails lists.
+    Keys are deduplicated, keeping their first position, and fetched in
+    queries of at most chunk_size keys each. Emails match regardless of
+    case, folded by the database the same way as its lower(email) index.
+    Every key gets an entry in the result, with a null user when it was not
+    found.
+    """
+
+    def __init__(self, data, max_size, chunk_size):
+        self.errors = {}
+        self.chunk_size = chunk_size
+
+        if isinstance(data, list):
+            data = {'ids': data}
+
+        if not isinstance(data, dict):
+            data = {}
+            self.errors['ids'] = 'ids or emails are required.'
+
+        self.ids = self.__parse_ids(data.get('ids', []))
+        self.emails = self.__parse_emails(data.get('emails', []))
+
+        if len(self.ids) + len(self.emails) > max_size:
+            self.errors['size'] = 'at most {} ids and emails.'.format(
+                max_size)
+
+        if self.errors:
+            raise ValidatorException(self.errors)
+
+    def fetch(self, query):
+        by_id = {
+            user.id: user
+            for chunk in self.__chunks(self.ids)
+            for user in query.filter(User.id.in_(chunk))}
+        by_email = {
+            email: user
+            for chunk in self.__chunks(self.emails)
+            for user, email in self.__fetch_emails(query, chunk)}
+
+        return [
+            ('id', id, by_id.get(id)) for id in self.ids
+        ] + [
+            ('email', email, by_email.get(email)) for email in self.emails
+        ]
+
+    def __chunks(self, keys):
+        for start in range(0, len(keys), self.chunk_size):
+            yield keys[start:start + self.chunk_size]
+
+    def __fetch_emails(self, query, emails):
+        emails = query.session.query(
+            func.unnest(array(emails)).label('email')).subquery()
+
+        return query.join(
+            emails, User.has_email(emails.c.email)
+        ).add_columns(emails.c.email)
+
+    def __parse_ids(self, ids):
+        if not isinstance(ids, list) or not all(
+                isinstance(id, int) and not isinstance(id, bool)
+                for id in ids):
+            self.errors['ids'] = 'ids must be a list of integers.'
+            return []
+
+        return list(dict.fromkeys(ids))
+
+    def __parse_emails(self, emails):
+        if not isinstance(emails, list) or not all(
+                isinstance(email, str) for email in emails):
+            self.errors['emails'] = 'emails must be a list of strings.'
+            return []
+
+        return list(dict.fromkeys(emails))
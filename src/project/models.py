@@ -1,10 +1,13 @@
 import uuid
+import hashlib
 import datetime
 
-from flask import current_app
+from sqlalchemy import DDL, String, and_, event, literal_column, or_
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 
-from project import db, bcrypt
+from project import db
+from project.hashing import hash_password
 
 
 metadata = db.metadata
@@ -22,7 +25,8 @@ group_users = db.Table(
         'user_id',
         db.Integer,
         db.ForeignKey('users.users.id'),
-        primary_key=True)
+        primary_key=True),
+    db.Index('ix_users_group_users_user_id', 'user_id', 'group_id')
 )
 
 
@@ -38,22 +42,64 @@ group_permissions = db.Table(
         'permission_id',
         db.Integer,
         db.ForeignKey('users.permissions.id'),
-        primary_key=True)
+        primary_key=True),
+    db.Index(
+        'ix_users_group_permissions_permission_id',
+        'permission_id', 'group_id')
 )
 
 
+for extension in ('unaccent', 'pg_trgm'):
+    event.listen(metadata, 'before_create', DDL(
+        'CREATE EXTENSION IF NOT EXISTS {} WITH SCHEMA public'.format(
+            extension)))
+
+event.listen(metadata, 'before_create', DDL(
+    "CREATE OR REPLACE FUNCTION users.immutable_unaccent(text) "
+    "RETURNS text AS $$ SELECT public.unaccent('public.unaccent', $1) $$ "
+    "LANGUAGE sql IMMUTABLE STRICT"))
+
+
+def unaccented(expression):
+    """Lowercased and unaccented expression, as the search index stores
+    it."""
+    return func.users.immutable_unaccent(
+        func.lower(expression), type_=String)
+
+
+def mask_from_bits(bits):
+    mask = 0
+
+    for bit in bits:
+        mask |= 1 << bit
+
+    return mask
+
+
 class User(db.Model):
     FIRST_NAME_MAX_LENGTH = 128
     LAST_NAME_MAX_LENGTH = 128
 
     __tablename__ = 'users'
-    __table_args__ = {'schema': 'users'}
+    __table_args__ = (
+        db.Index('ix_users_users_active_id', 'active', 'id'),
+        db.Index(
+            'ix_users_users_admins', 'id', postgresql_where=db.text('admin')),
+        db.Index('ix_users_users_updated_id', 'updated', 'id'),
+        db.Index('ix_users_users_created_id', 'created', 'id'),
+        db.Index('ix_users_users_last_name_id', 'last_name', 'id'),
+        db.Index('ix_users_users_expiration', 'expiration'),
+        db.Index(
+            'ix_users_users_status', 'expiration', 'id',
+            postgresql_where=db.text('active IS true')),
+        {'schema': 'users'}
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     first_name = db.Column(db.String(FIRST_NAME_MAX_LENGTH), nullable=False)
     last_name = db.Column(db.String(LAST_NAME_MAX_LENGTH), nullable=False)
     email = db.Column(db.String(256), unique=True, nullable=False)
-    password = db.Column(db.String(128), nullable=False)
+    password = db.deferred(db.Column(db.String(128), nullable=False))
     active = db.Column(db.Boolean, default=True, nullable=False)
     expiration = db.Column(db.Date, nullable=True)
     created = db.Column(db.DateTime, default=func.now(), nullable=False)
@@ -62,6 +108,8 @@ class User(db.Model):
     updated_by = db.Column(db.Integer)
     hash = db.Column(db.String(40), nullable=False)
     admin = db.Column(db.Boolean, default=False, nullable=False)
+    permissions_version = db.Column(
+        db.Integer, default=0, server_default='0', nullable=False)
     groups = db.relationship('Group', secondary=group_users)
 
     def __init__(self, **kwargs):
@@ -73,19 +121,18 @@ class User(db.Model):
         if 'password' not in kwargs:
             return None
 
-        return bcrypt.generate_password_hash(
-            kwargs['password'],
-            current_app.config.get('BCRYPT_LOG_ROUNDS')).decode()
+        return hash_password(kwargs['password'])
 
     @property
-    def permissions(self):
-        permissions = set()
+    def permission_mask(self):
+        mask = 0
+
         for group in self.groups:
-            for permission in group.permissions:
-                permissions.add(permission.code)
-        return list(permissions)
+            mask |= group.permission_mask
 
-    @property
+        return mask
+
+    @hybrid_property
     def status(self):
         if self.active is False:
             return False
@@ -95,15 +142,44 @@ class User(db.Model):
 
         return datetime.date.today() < self.expiration
 
+    @status.expression
+    def status(cls):
+        return and_(
+            cls.active.is_(True),
+            or_(
+                cls.expiration.is_(None),
+                cls.expiration > func.current_date()))
+
+    @hybrid_property
+    def email_key(self):
+        return self.email.lower()
+
+    @email_key.expression
+    def email_key(cls):
+        return func.lower(cls.email)
+
+    @classmethod
+    def has_email(cls, email):
+        """Case insensitive email match, served by the unique lower(email)
+        index."""
+        return cls.email_key == func.lower(email)
+
     @property
     def full_name(self):
         return '{} {}'.format(self.first_name, self.last_name)
 
-    def is_authorized(self, required_permissions):
-        for permission in required_permissions:
-            if permission not in self.permissions:
-                return False
-        return True
+
+db.Index('ix_users_users_lower_email', User.email_key, unique=True)
+
+search_document = unaccented(
+    User.first_name + literal_column("' '") + User.last_name +
+    literal_column("' '") + User.email)
+
+db.Index(
+    'ix_users_users_search',
+    search_document.label('search'),
+    postgresql_using='gin',
+    postgresql_ops={'search': 'gin_trgm_ops'})
 
 
 class Permission(db.Model):
@@ -129,3 +205,65 @@ class Group(db.Model):
     name = db.Column(db.String(NAME_MAX_LENGTH), nullable=False)
     users = db.relationship(User, secondary=group_users)
     permissions = db.relationship(Permission, secondary=group_permissions)
+
+    @property
+    def permission_mask(self):
+        return mask_from_bits(
+            permission.id for permission in self.permissions)
+
+
+class ChangeCounter(db.Model):
+    """Versions of tables, bumped by statement level triggers on every write
+    to them, whoever makes it."""
+    __tablename__ = 'change_counters'
+    __table_args__ = {'schema': 'users'}
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(
+        db.BigInteger, default=0, server_default='0', nullable=False)
+
+
+event.listen(metadata, 'before_create', DDL(
+    "CREATE OR REPLACE FUNCTION users.touch_change_counters() "
+    "RETURNS trigger AS $$ "
+    "DECLARE counter text; "
+    "BEGIN "
+    "FOREACH counter IN ARRAY TG_ARGV LOOP "
+    "INSERT INTO users.change_counters (name, version) "
+    "VALUES (counter, 1) ON CONFLICT (name) DO UPDATE "
+    "SET version = users.change_counters.version + 1; "
+    "END LOOP; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql"))
+
+for table, events, counter in (
+        (Permission.__table__, 'INSERT OR UPDATE OR DELETE OR TRUNCATE',
+         'permissions'),
+        (Group.__table__, 'INSERT OR UPDATE OR DELETE OR TRUNCATE', 'groups'),
+        (Group.__table__, 'DELETE OR TRUNCATE', 'group_permissions'),
+        (group_permissions, 'INSERT OR UPDATE OR DELETE OR TRUNCATE',
+         'group_permissions')):
+    event.listen(table, 'after_create', DDL(
+        "CREATE TRIGGER touch_{counter}_counter AFTER {events} "
+        "ON users.{table} FOR EACH STATEMENT "
+        "EXECUTE PROCEDURE users.touch_change_counters('{counter}')".format(
+            table=table.name, events=events, counter=counter)))
+
+
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_tokens'
+    __table_args__ = {'schema': 'users'}
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.users.id'),
+        nullable=False,
+        index=True)
+    token_hash = db.Column(db.String(64), nullable=False, unique=True)
+    expires = db.Column(db.DateTime, nullable=False, index=True)
+    created = db.Column(db.DateTime, default=func.now(), nullable=False)
+
+    @staticmethod
+    def hash(token):
+        return hashlib.sha256(token.encode()).hexdigest()
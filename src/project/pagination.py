@@ -0,0 +1,199 @@
+import json
+import base64
+import binascii
+import datetime
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import undefer
+
+from project.models import User, group_users
+from project.validators.exceptions import ValidatorException
+
+
+def in_group(group_id):
+    return User.id.in_(
+        select([group_users.c.user_id]).where(
+            group_users.c.group_id == group_id))
+
+
+class UserPage:
+    """Filters, sorting and keyset pagination of users from query args.
+
+    Rows are ordered by the sort column and then by id. The cursor holds
+    the last row's sort value and id, so the next page starts right after
+    it with an indexed range condition instead of an offset. Without a
+    limit every matching row is returned, as before.
+    """
+
+    SORTS = {
+        'id': User.id,
+        'email': User.email,
+        'last_name': User.last_name,
+        'created': User.created,
+    }
+    BOOLEANS = {'true': True, 'false': False}
+
+    def __init__(self, args, max_limit):
+        self.errors = {}
+
+        sort = args.get('sort', 'id')
+        self.descending = sort.startswith('-')
+        self.sort = sort[1:] if self.descending else sort
+        if self.sort not in self.SORTS:
+            self.errors['sort'] = 'sort must be one of {}.'.format(
+                ', '.join(sorted(self.SORTS)))
+
+        self.limit = self.__parse_limit(args, max_limit)
+        self.active = self.__parse_boolean(args, 'active')
+        self.status = self.__parse_boolean(args, 'status')
+        self.admin = self.__parse_boolean(args, 'admin')
+        self.group = self.__parse_integer(args, 'group')
+        self.expiration_from = self.__parse_date(args, 'expiration_from')
+        self.expiration_to = self.__parse_date(args, 'expiration_to')
+        self.cursor = self.__parse_cursor(args)
+
+        if self.errors:
+            raise ValidatorException(self.errors)
+
+    def filter(self, query):
+        if self.active is not None:
+            query = query.filter(User.active == self.active)
+
+        if self.status is not None:
+            query = query.filter(
+                User.status if self.status else ~User.status)
+
+        if self.admin is not None:
+            query = query.filter(User.admin == self.admin)
+
+        if self.group is not None:
+            query = query.filter(in_group(self.group))
+
+        if self.expiration_from is not None:
+            query = query.filter(User.expiration >= self.expiration_from)
+
+        if self.expiration_to is not None:
+            query = query.filter(User.expiration <= self.expiration_to)
+
+        return query
+
+    def order(self, query):
+        """Filters query and orders it from the cursor on."""
+        columns = [self.SORTS[self.sort]]
+        if self.sort != 'id':
+            columns.append(User.id)
+
+        query = self.filter(query)
+
+        if self.cursor is not None:
+            query = query.filter(self.__after(columns, self.cursor))
+
+        if self.descending:
+            return query.order_by(*[column.desc() for column in columns])
+
+        return query.order_by(*[column.asc() for column in columns])
+
+    def fetch(self, query):
+        """Returns the page of users and the cursor of the next page."""
+        query = self.order(query)
+
+        if self.limit is None:
+            return query.all(), None
+
+        users = query.options(undefer(self.SORTS[self.sort])).limit(
+            self.limit + 1).all()
+
+        if len(users) <= self.limit:
+            return users, None
+
+        users = users[:self.limit]
+
+        return users, self.__encode_cursor(users[-1])
+
+    def __after(self, columns, values):
+        """Rows strictly after values, compared as a row so the composite
+        (column, id) index serves the range."""
+        row = tuple_(*columns)
+        values = tuple_(*values[:len(columns)])
+
+        return row < values if self.descending else row > values
+
+    def __encode_cursor(self, user):
+        value = getattr(user, self.sort)
+
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+
+        cursor = json.dumps([self.sort, value, user.id]).encode()
+
+        return base64.urlsafe_b64encode(cursor).decode()
+
+    def __parse_cursor(self, args):
+        if 'cursor' not in args:
+            return None
+
+        try:
+            sort, value, id = json.loads(
+                base64.urlsafe_b64decode(args['cursor'].encode()))
+
+            if sort != self.sort or sort not in self.SORTS \
+                    or not isinstance(id, int) or isinstance(id, bool):
+                raise ValueError
+
+            return self.__parse_cursor_value(sort, value), id
+        except (ValueError, TypeError, binascii.Error):
+            self.errors['cursor'] = 'cursor is invalid.'
+
+    def __parse_cursor_value(self, sort, value):
+        """Checks value against the sort column's type, so a tampered
+        cursor is rejected here instead of failing in the database."""
+        python_type = self.SORTS[sort].type.python_type
+
+        if python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+
+        if not isinstance(value, python_type) or isinstance(value, bool):
+            raise ValueError
+
+        return value
+
+    def __parse_limit(self, args, max_limit):
+        if 'limit' not in args:
+            return None
+
+        limit = self.__parse_integer(args, 'limit')
+
+        if limit is not None and not 1 <= limit <= max_limit:
+            self.errors['limit'] = 'limit must be between 1 and {}.'.format(
+                max_limit)
+
+        return limit
+
+    def __parse_integer(self, args, field):
+        if field not in args:
+            return None
+
+        try:
+            return int(args[field])
+        except ValueError:
+            self.errors[field] = '{} must be an integer.'.format(field)
+
+    def __parse_boolean(self, args, field):
+        if field not in args:
+            return None
+
+        if args[field] not in self.BOOLEANS:
+            self.errors[field] = '{} must be true or false.'.format(field)
+            return None
+
+        return self.BOOLEANS[args[field]]
+
+    def __parse_date(self, args, field):
+        if field not in args:
+            return None
+
+        try:
+            return datetime.datetime.strptime(args[field], '%Y-%m-%d').date()
+        except ValueError:
+            self.errors[field] = '{} must be a YYYY-MM-DD date.'.format(
+                field)
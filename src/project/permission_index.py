@@ -0,0 +1,90 @@
+import time
+
+from flask import current_app
+
+from project import db
+from project.cache import get_app_cache
+from project.models import Permission
+
+
+class PermissionIndex:
+    """Maps permission codes to bit positions.
+
+    A permission's id is its bit, so positions are stable and never reused.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.loaded_at = time.monotonic()
+        self.codes = {bit: code for code, bit in bits.items()}
+        self.known_mask = self.mask(bits.keys())
+
+    def mask(self, codes):
+        mask = 0
+
+        for code in codes:
+            bit = self.bits.get(code)
+
+            if bit is None:
+                return None
+
+            mask |= 1 << bit
+
+        return mask
+
+    def covers(self, mask):
+        return mask & ~self.known_mask == 0
+
+    def decode(self, mask):
+        return [code for bit, code in self.codes.items() if mask >> bit & 1]
+
+
+def load_permission_index():
+    return PermissionIndex(dict(
+        db.session.query(Permission.code, Permission.id)))
+
+
+def get_permission_index(refresh=False):
+    """Returns the cached index, reloading it when refresh is set.
+
+    Refreshes are asked for by unknown codes and bits, which callers control,
+    so at most one runs every PERMISSION_INDEX_MIN_REFRESH_SECONDS. Until
+    then unknown codes stay unknown without reading the table again.
+    """
+    config = current_app.config
+    cache = get_app_cache(
+        'permission_index',
+        max_size=1,
+        ttl=config.get('PERMISSION_INDEX_TTL_SECONDS'))
+    index = cache.get('index')
+
+    if refresh and index is not None:
+        age = time.monotonic() - index.loaded_at
+
+        if age >= config.get('PERMISSION_INDEX_MIN_REFRESH_SECONDS'):
+            index = None
+
+    if index is None:
+        index = load_permission_index()
+        cache.set('index', index)
+
+    return index
+
+
+def permission_mask(codes):
+    """Returns the bitmask for codes, or None if any code does not exist."""
+    mask = get_permission_index().mask(codes)
+
+    if mask is None:
+        mask = get_permission_index(refresh=True).mask(codes)
+
+    return mask
+
+
+def permission_codes(mask):
+    index = get_permission_index()
+
+    if not index.covers(mask):
+        index = get_permission_index(refresh=True)
+
+    return index.decode(mask)
@@ -0,0 +1,222 @@
+from flask import current_app
+from sqlalchemy import func
+
+from project import db
+from project.cache import get_app_cache
+from project.models import (
+    User, group_users, group_permissions, mask_from_bits)
+from project.permission_index import permission_mask, permission_codes
+
+
+PRINCIPAL_CACHES = ('principal_cache', 'permissions_version_cache')
+
+
+class Principal:
+    def __init__(self, id, active, admin, expiration, permission_mask=0,
+                 permissions_version=None):
+        self.id = id
+        self.active = active
+        self.admin = admin
+        self.expiration = expiration
+        self.permission_mask = permission_mask
+        self.permissions_version = permissions_version
+
+    @property
+    def permissions(self):
+        return permission_codes(self.permission_mask)
+
+    def is_authorized(self, required_permissions):
+        required_mask = permission_mask(required_permissions)
+
+        if required_mask is None:
+            return False
+
+        return self.has_permission_mask(required_mask)
+
+    def has_permission_mask(self, required_mask):
+        return self.permission_mask & required_mask == required_mask
+
+
+def principal_query():
+    bits = func.array_agg(
+        func.distinct(group_permissions.c.permission_id)
+    ).filter(group_permissions.c.permission_id.isnot(None))
+
+    return db.session.query(
+        User.id, User.active, User.admin, User.expiration,
+        User.permissions_version, bits
+    ).outerjoin(
+        group_users, group_users.c.user_id == User.id
+    ).outerjoin(
+        group_permissions,
+        group_permissions.c.group_id == group_users.c.group_id
+    ).group_by(User.id)
+
+
+def principal_from_row(row):
+    id, active, admin, expiration, permissions_version, bits = row
+
+    return Principal(
+        id, active, admin, expiration, mask_from_bits(bits or []),
+        permissions_version)
+
+
+def load_principal(user_id):
+    row = principal_query().filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+
+    return principal_from_row(row)
+
+
+def load_principals(user_ids):
+    if not user_ids:
+        return {}
+
+    rows = principal_query().filter(User.id.in_(list(user_ids)))
+
+    return {row.id: principal_from_row(row) for row in rows}
+
+
+def get_principal_cache():
+    return get_app_cache(
+        'principal_cache',
+        max_size=current_app.config.get('PRINCIPAL_CACHE_SIZE'),
+        ttl=current_app.config.get('PRINCIPAL_CACHE_TTL_SECONDS'))
+
+
+def get_principal(user_id):
+    if not current_app.config.get('PRINCIPAL_CACHE_ENABLED'):
+        return load_principal(user_id)
+
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+
+    if principal is None:
+        principal = load_principal(user_id)
+
+        if principal is not None:
+            cache.set(user_id, principal)
+
+    return principal
+
+
+def get_principals(user_ids):
+    """Returns a dict of principals by user id, loading misses at once."""
+    if not current_app.config.get('PRINCIPAL_CACHE_ENABLED'):
+        return load_principals(user_ids)
+
+    cache = get_principal_cache()
+    principals = {}
+    missing = set()
+
+    for user_id in user_ids:
+        principal = cache.get(user_id)
+
+        if principal is None:
+            missing.add(user_id)
+        else:
+            principals[user_id] = principal
+
+    if missing:
+        for user_id, principal in load_principals(missing).items():
+            cache.set(user_id, principal)
+            principals[user_id] = principal
+
+    return principals
+
+
+def get_permissions_version_cache():
+    return get_app_cache(
+        'permissions_version_cache',
+        max_size=current_app.config.get('PRINCIPAL_CACHE_SIZE'),
+        ttl=current_app.config.get('PRINCIPAL_CACHE_TTL_SECONDS'))
+
+
+def get_permissions_version(user_id):
+    enabled = current_app.config.get('PRINCIPAL_CACHE_ENABLED')
+
+    if enabled:
+        version = get_permissions_version_cache().get(user_id)
+
+        if version is not None:
+            return version
+
+    version = db.session.query(User.permissions_version).filter(
+        User.id == user_id).scalar()
+
+    if enabled and version is not None:
+        get_permissions_version_cache().set(user_id, version)
+
+    return version
+
+
+def resolve_principal(payload):
+    """Returns the principal for a decoded token payload.
+
+    Tokens issued with permission claims are trusted while their permissions
+    version matches the user's current one; otherwise the principal is
+    loaded from the database.
+    """
+    if current_app.config.get('TOKEN_PERMISSION_CLAIMS') and 'pv' in payload:
+        version = get_permissions_version(payload['sub'])
+
+        if version is None:
+            return None
+
+        if version == payload['pv']:
+            return Principal(
+                payload['sub'], True, payload['admin'], None,
+                int(payload['pm'], 16), version)
+
+    return get_principal(payload['sub'])
+
+
+def touch_principals(*user_ids):
+    users = User.__table__
+
+    db.session.execute(users.update().where(
+        users.c.id.in_([int(user_id) for user_id in user_ids])
+    ).values(
+        permissions_version=users.c.permissions_version + 1,
+        updated=users.c.updated))
+
+
+def touch_group_principals(group_id):
+    users = User.__table__
+    member_ids = db.select([group_users.c.user_id]).where(
+        group_users.c.group_id == group_id)
+
+    db.session.execute(users.update().where(
+        users.c.id.in_(member_ids)
+    ).values(
+        permissions_version=users.c.permissions_version + 1,
+        updated=users.c.updated))
+
+
+def invalidate_principals(*user_ids):
+    for name in PRINCIPAL_CACHES:
+        cache = current_app.extensions.get(name)
+
+        if cache is None:
+            continue
+
+        for user_id in user_ids:
+            cache.delete(int(user_id))
+
+
+def group_member_ids(group_id):
+    user_ids = db.session.query(group_users.c.user_id).filter(
+        group_users.c.group_id == group_id)
+
+    return [user_id for user_id, in user_ids]
+
+
+def invalidate_group_principals(group_id):
+    caches = [current_app.extensions.get(name) for name in PRINCIPAL_CACHES]
+
+    if all(cache is None for cache in caches):
+        return
+
+    invalidate_principals(*group_member_ids(group_id))
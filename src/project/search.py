@@ -0,0 +1,86 @@
+from sqlalchemy import case, func, literal, or_
+
+from project.models import User, search_document, unaccented
+from project.validators.exceptions import ValidatorException
+
+
+class UserSearch:
+    """Case and accent insensitive search of users by name and email.
+
+    The term is matched as a substring of first name, last name and email
+    joined together, which the trigram index on search_document serves.
+    Users with a field starting with the term come first, then the closest
+    matches by trigram similarity. Terms shorter than a trigram cannot use
+    the index, so they are rejected instead of scanning every user.
+
+    Ranking unaccents every row it compares, so only the first
+    max_candidates matches the index returns are ranked. Terms matching
+    more users than that are ranked among an arbitrary subset of them.
+    """
+
+    ESCAPED = ('\\', '%', '_')
+
+    def __init__(self, args, min_length, default_limit, max_limit,
+                 max_candidates):
+        self.errors = {}
+        self.term = self.__parse_term(args, min_length)
+        self.limit = self.__parse_limit(args, default_limit, max_limit)
+        self.max_candidates = max_candidates
+
+        if self.errors:
+            raise ValidatorException(self.errors)
+
+    def fetch(self, query):
+        needle = unaccented(literal(self.__escape(self.term)))
+        prefix = needle + '%'
+        prefix_match = or_(
+            unaccented(User.first_name).like(prefix, escape='\\'),
+            unaccented(User.last_name).like(prefix, escape='\\'),
+            unaccented(User.email).like(prefix, escape='\\'))
+
+        prefix_rank = case([(prefix_match, 0)], else_=1).label('prefix_rank')
+        similarity = func.similarity(search_document, needle).label(
+            'similarity')
+
+        rows = query.filter(
+            search_document.like('%' + needle + '%', escape='\\')
+        ).add_columns(
+            prefix_rank, similarity
+        ).limit(self.max_candidates).from_self().order_by(
+            prefix_rank, similarity.desc(), User.id.asc()
+        ).limit(self.limit).all()
+
+        return [user for user, _, _ in rows]
+
+    def __escape(self, term):
+        for character in self.ESCAPED:
+            term = term.replace(character, '\\' + character)
+
+        return term
+
+    def __parse_term(self, args, min_length):
+        term = args.get('q', '').strip()
+
+        if not term:
+            self.errors['q'] = 'q is required.'
+        elif len(term) < min_length:
+            self.errors['q'] = 'q must be at least {} characters long.'.format(
+                min_length)
+
+        return term
+
+    def __parse_limit(self, args, default_limit, max_limit):
+        if 'limit' not in args:
+            return default_limit
+
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            self.errors['limit'] = 'limit must be an integer.'
+            return None
+
+        if not 1 <= limit <= max_limit:
+            self.errors['limit'] = 'limit must be between 1 and {}.'.format(
+                max_limit)
+
+        return limit
@@ -1,30 +1,76 @@
 import jwt
+import time
+import hashlib
 import datetime
 from flask import current_app
 
+from project.cache import get_app_cache
+from project.keys import KeyRing, UnknownKey, get_key_ring
+from project.validators.exceptions import ValidatorException
+
 
 class UserSerializer:
+    FIELDS = {
+        'id': lambda user: user.id,
+        'first_name': lambda user: user.first_name,
+        'last_name': lambda user: user.last_name,
+        'email': lambda user: user.email,
+        'active': lambda user: user.status,
+        'expiration': lambda user: user.expiration,
+        'created': lambda user: user.created,
+        'created_by': lambda user: user.created_by,
+        'updated': lambda user: str(user.updated),
+        'updated_by': lambda user: user.updated_by,
+        'hash': lambda user: user.hash,
+        'admin': lambda user: user.admin,
+        'group_id': lambda user: (
+            user.groups[0].id if len(user.groups) > 0 else ""),
+    }
+    COLUMNS = {
+        'active': ('active', 'expiration'),
+        'group_id': (),
+    }
+
     @staticmethod
-    def to_dict(user):
+    def parse_fields(value):
+        """Returns the fields of a comma separated list, or None for all."""
+        if value is None:
+            return None
+
+        fields = tuple(field for field in value.split(',') if field)
+        unknown = [
+            field for field in fields if field not in UserSerializer.FIELDS]
+
+        if unknown or not fields:
+            raise ValidatorException({
+                'fields': 'fields must be some of {}.'.format(
+                    ', '.join(UserSerializer.FIELDS))})
+
+        return fields
+
+    @staticmethod
+    def columns(fields=None):
+        """Returns the user columns needed to serialize fields."""
+        columns = []
+
+        for field in fields or UserSerializer.FIELDS:
+            for column in UserSerializer.COLUMNS.get(field, (field,)):
+                if column not in columns:
+                    columns.append(column)
+
+        return columns
+
+    @staticmethod
+    def to_dict(user, fields=None):
         return {
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email,
-            'active': user.status,
-            'expiration': str(user.expiration) if user.expiration else None,
-            'created': str(user.created),
-            'created_by': user.created_by,
-            'updated': str(user.updated),
-            'updated_by': user.updated_by,
-            'hash': user.hash,
-            'admin': user.admin,
-            'group_id': user.groups[0].id if len(user.groups) > 0 else ""
+            field: UserSerializer.FIELDS[field](user)
+            for field in fields or UserSerializer.FIELDS
         }
 
     @staticmethod
-    def to_array(users):
-        return list(map(lambda user: UserSerializer.to_dict(user), users))
+    def to_array(users, fields=None):
+        return list(
+            map(lambda user: UserSerializer.to_dict(user, fields), users))
 
 
 class GroupSerializer:
@@ -68,23 +114,102 @@ class TokenSerializer:
     @staticmethod
     def encode(user):
         secret = current_app.config.get('SECRET_KEY')
+        now = datetime.datetime.utcnow()
         payload = {
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(
-                days=current_app.config.get('TOKEN_EXPIRATION_DAYS'),
-                seconds=current_app.config.get('TOKEN_EXPIRATION_SECONDS')
-            ),
-            'iat': datetime.datetime.utcnow(),
+            'exp': now + TokenSerializer.lifetime(),
+            'iat': now,
             'sub': user.id,
             'admin': user.admin
         }
+
+        if current_app.config.get('TOKEN_PERMISSION_CLAIMS'):
+            payload['pm'] = format(user.permission_mask, 'x')
+            payload['pv'] = user.permissions_version
+
+        if current_app.config.get('JWT_ALGORITHM') == KeyRing.ALGORITHM:
+            kid, private_key = get_key_ring().signing_key()
+            return jwt.encode(
+                payload, private_key, algorithm=KeyRing.ALGORITHM,
+                headers={'kid': kid})
+
         return jwt.encode(payload, secret, algorithm='HS256')
 
+    @staticmethod
+    def lifetime():
+        if current_app.config.get('REFRESH_TOKENS_ENABLED'):
+            return datetime.timedelta(minutes=current_app.config.get(
+                'ACCESS_TOKEN_EXPIRATION_MINUTES'))
+
+        return datetime.timedelta(
+            days=current_app.config.get('TOKEN_EXPIRATION_DAYS'),
+            seconds=current_app.config.get('TOKEN_EXPIRATION_SECONDS'))
+
     @staticmethod
     def decode(token):
-        secret = current_app.config.get('SECRET_KEY')
+        if not current_app.config.get('TOKEN_CACHE_ENABLED'):
+            return TokenSerializer.verify(token)
+
+        cache = get_token_cache()
+        key = TokenSerializer.digest(token)
+        payload = cache.get(key)
+
+        if payload is None:
+            rejected_cache = get_rejected_token_cache()
+            error = rejected_cache.get(key)
+
+            if error is not None:
+                raise error
+
+            try:
+                payload = TokenSerializer.verify(token)
+            except (InvalidToken, ExpiredToken) as e:
+                rejected_cache.set(key, e.__class__)
+                raise
+
+            ttl = payload.get('exp', 0) - time.time()
+            if ttl > 0:
+                cache.set(key, payload, ttl=ttl)
+
+        return dict(payload)
+
+    @staticmethod
+    def verify(token):
         try:
-            return jwt.decode(token, secret)
-        except jwt.exceptions.DecodeError:
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get('alg')
+
+            if algorithm == KeyRing.ALGORITHM:
+                key = get_key_ring().public_key(header.get('kid'))
+            elif algorithm == 'HS256':
+                key = current_app.config.get('SECRET_KEY')
+            else:
+                raise InvalidToken
+
+            return jwt.decode(token, key, algorithms=[algorithm])
+        except (jwt.exceptions.DecodeError, UnknownKey):
             raise InvalidToken
         except jwt.exceptions.ExpiredSignatureError:
             raise ExpiredToken
+
+    @staticmethod
+    def digest(token):
+        if isinstance(token, str):
+            token = token.encode()
+
+        return hashlib.sha256(token).digest()
+
+
+def get_token_cache():
+    return get_app_cache(
+        'token_cache',
+        max_size=current_app.config.get('TOKEN_CACHE_SIZE'),
+        ttl=current_app.config.get('TOKEN_CACHE_NEGATIVE_TTL_SECONDS'))
+
+
+def get_rejected_token_cache():
+    """Invalid and expired tokens, apart from the verified ones so that
+    distinct garbage tokens can't evict them."""
+    return get_app_cache(
+        'rejected_token_cache',
+        max_size=current_app.config.get('TOKEN_CACHE_NEGATIVE_SIZE'),
+        ttl=current_app.config.get('TOKEN_CACHE_NEGATIVE_TTL_SECONDS'))
@@ -5,6 +5,11 @@ from project import create_app, db
 
 app = create_app()
 
+APP_CACHES = (
+    'principal_cache', 'permissions_version_cache', 'token_cache',
+    'rejected_token_cache', 'permission_index', 'login_throttle',
+    'json_encoder')
+
 
 class BaseTestCase(TestCase):
     def create_app(self):
@@ -12,6 +17,9 @@ class BaseTestCase(TestCase):
         return app
 
     def setUp(self):
+        for name in APP_CACHES:
+            app.extensions.pop(name, None)
+
         db.create_all()
         db.session.commit()
 
@@ -1,7 +1,16 @@
+import os
 import json
 import random
+import shutil
 import datetime
+import tempfile
 import unittest
+from unittest.mock import patch
+
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 
 from flask import current_app
 
@@ -13,7 +22,7 @@ from project.tests.utils import (
 
 from project import db
 from project.tests.base import BaseTestCase
-from project.models import User
+from project.models import User, RefreshToken
 from project.serializers import TokenSerializer, InvalidToken
 
 
@@ -66,6 +75,14 @@ class TestLogin(BaseTestCase):
         response = self.do_login(login_data)
         self.assertEqual(response.status_code, 200)
 
+    def test_login_with_mixed_case_stored_email(self):
+        """Ensure emails stored before normalization can login"""
+        email, password = get_login_data()
+        self.add_user(email=email.upper(), password=password)
+
+        response = self.do_login({'email': email, 'password': password})
+        self.assertEqual(response.status_code, 200)
+
     def test_login_not_found(self):
         """Ensure login not found behaves correctly"""
         email, password = get_login_data()
@@ -149,6 +166,117 @@ class TestLogin(BaseTestCase):
             self.assertEqual(response.status_code, 400)
 
 
+class TestRefreshToken(BaseTestCase):
+    """Tests for refresh tokens"""
+
+    def setUp(self):
+        super().setUp()
+        current_app.config['REFRESH_TOKENS_ENABLED'] = True
+
+    def tearDown(self):
+        current_app.config['REFRESH_TOKENS_ENABLED'] = False
+        super().tearDown()
+
+    def do_login(self, user, password):
+        with self.client:
+            response = self.client.post(
+                '/auth/login',
+                data=json.dumps({'email': user.email, 'password': password}),
+                content_type='application/json'
+            )
+            return json.loads(response.data.decode())
+
+    def do_refresh(self, refresh_token):
+        with self.client:
+            return self.client.post(
+                '/auth/refresh',
+                data=json.dumps({'refresh_token': refresh_token}),
+                content_type='application/json'
+            )
+
+    def add_user(self):
+        _, password = get_login_data()
+        user = add_user()
+        user.password = user.generate_password_hash(password=password)
+        db.session.commit()
+        return user, password
+
+    def test_login_issues_refresh_token(self):
+        """Ensure login returns a short lived token and a refresh token"""
+        user, password = self.add_user()
+
+        tokens = self.do_login(user, password)
+
+        payload = TokenSerializer.decode(tokens['token'])
+        lifetime = current_app.config['ACCESS_TOKEN_EXPIRATION_MINUTES'] * 60
+        self.assertEqual(payload['exp'] - payload['iat'], lifetime)
+        self.assertEqual(RefreshToken.query.count(), 1)
+        self.assertNotEqual(
+            RefreshToken.query.first().token_hash, tokens['refresh_token'])
+
+    def test_refresh_rotates_token(self):
+        """Ensure a refresh token can only be used once"""
+        user, password = self.add_user()
+        tokens = self.do_login(user, password)
+
+        response = self.do_refresh(tokens['refresh_token'])
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            TokenSerializer.decode(response_data['token'])['sub'], user.id)
+        self.assertNotEqual(
+            response_data['refresh_token'], tokens['refresh_token'])
+        self.assertEqual(RefreshToken.query.count(), 1)
+
+        response = self.do_refresh(tokens['refresh_token'])
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_expired_token(self):
+        """Ensure an expired refresh token is rejected"""
+        user, password = self.add_user()
+        tokens = self.do_login(user, password)
+        refresh_token = RefreshToken.query.first()
+        refresh_token.expires = datetime.datetime.utcnow()
+        db.session.commit()
+
+        response = self.do_refresh(tokens['refresh_token'])
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(RefreshToken.query.count(), 0)
+
+    def test_refresh_inactive_user(self):
+        """Ensure an inactive user cannot refresh"""
+        user, password = self.add_user()
+        tokens = self.do_login(user, password)
+        user.active = False
+        db.session.commit()
+
+        response = self.do_refresh(tokens['refresh_token'])
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_without_token(self):
+        """Ensure refresh without token is an invalid payload"""
+        with self.client:
+            response = self.client.post(
+                '/auth/refresh',
+                data=json.dumps({}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_refresh_with_not_string_token(self):
+        """Ensure a refresh token that is not a string is an invalid
+        payload"""
+        for refresh_token in [1234, ['token'], {'token': 'token'}]:
+            response = self.do_refresh(refresh_token)
+            response_data = json.loads(response.data.decode())
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('refresh_token', response_data['data'])
+
+
 class TestToken(BaseTestCase):
     """Tests for token encode/decode"""
 
@@ -171,6 +299,140 @@ class TestToken(BaseTestCase):
         with self.assertRaises(InvalidToken):
             TokenSerializer.decode(token)
 
+    def test_decode_cached_token(self):
+        """Ensure a verified token is served from the token cache"""
+        user = add_user()
+        token = login_user(user)
+
+        first = TokenSerializer.decode(token)
+        second = TokenSerializer.decode(token)
+
+        stats = current_app.extensions['token_cache'].stats()
+        self.assertEqual(first, second)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_decode_invalid_token_is_negatively_cached(self):
+        """Ensure an invalid token is rejected from the token cache"""
+        token = random_string(16)
+
+        for i in range(0, 2):
+            with self.assertRaises(InvalidToken):
+                TokenSerializer.decode(token)
+
+        stats = current_app.extensions['rejected_token_cache'].stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_invalid_tokens_do_not_evict_valid_tokens(self):
+        """Ensure distinct invalid tokens leave verified tokens cached"""
+        token = login_user(add_user())
+
+        with patch.dict(current_app.config, {
+                'TOKEN_CACHE_SIZE': 2, 'TOKEN_CACHE_NEGATIVE_SIZE': 2}):
+            TokenSerializer.decode(token)
+
+            for i in range(0, 4):
+                with self.assertRaises(InvalidToken):
+                    TokenSerializer.decode(random_string(16))
+
+            TokenSerializer.decode(token)
+
+        stats = current_app.extensions['token_cache'].stats()
+        self.assertEqual(stats['hits'], 1)
+
+
+class TestAsymmetricToken(BaseTestCase):
+    """Tests for RS256 signed tokens"""
+
+    def setUp(self):
+        super().setUp()
+        self.keys_path = tempfile.mkdtemp()
+        for kid in ['first', 'second']:
+            self.__add_key(kid)
+        current_app.config['JWT_KEYS_PATH'] = self.keys_path
+        current_app.config['JWT_ACTIVE_KEY_ID'] = 'second'
+        current_app.config['JWT_ALGORITHM'] = 'RS256'
+        current_app.extensions.pop('key_ring', None)
+
+    def tearDown(self):
+        current_app.config['JWT_KEYS_PATH'] = None
+        current_app.config['JWT_ACTIVE_KEY_ID'] = None
+        current_app.config['JWT_ALGORITHM'] = 'HS256'
+        current_app.extensions.pop('key_ring', None)
+        shutil.rmtree(self.keys_path)
+        super().tearDown()
+
+    def __add_key(self, kid):
+        key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048, backend=default_backend())
+        with open(os.path.join(self.keys_path, kid + '.pem'), 'wb') as f:
+            f.write(key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()))
+
+    def test_encode_with_active_key(self):
+        """Ensure tokens are signed with the active key id"""
+        user = add_user()
+        token = login_user(user)
+
+        header = jwt.get_unverified_header(token)
+
+        self.assertEqual(header['alg'], 'RS256')
+        self.assertEqual(header['kid'], 'second')
+        self.assertEqual(TokenSerializer.decode(token)['sub'], user.id)
+
+    def test_decode_hs256_fallback(self):
+        """Ensure HS256 tokens are still accepted"""
+        user = add_user()
+        current_app.config['JWT_ALGORITHM'] = 'HS256'
+        token = login_user(user)
+
+        self.assertEqual(TokenSerializer.decode(token)['sub'], user.id)
+
+    def test_decode_unknown_key(self):
+        """Ensure tokens signed with an unknown key id are invalid"""
+        user = add_user()
+        token = login_user(user)
+        os.remove(os.path.join(self.keys_path, 'second.pem'))
+        current_app.extensions.pop('key_ring', None)
+        current_app.extensions.pop('token_cache', None)
+
+        with self.assertRaises(InvalidToken):
+            TokenSerializer.decode(token)
+
+    def test_decode_without_keys_path(self):
+        """Ensure RS256 tokens are invalid when no keys path is set, even
+        with keys in the working directory"""
+        user = add_user()
+        token = login_user(user)
+        current_app.config['JWT_KEYS_PATH'] = None
+        current_app.extensions.pop('key_ring', None)
+        current_app.extensions.pop('token_cache', None)
+        cwd = os.getcwd()
+        os.chdir(self.keys_path)
+
+        try:
+            with self.assertRaises(InvalidToken):
+                TokenSerializer.decode(token)
+        finally:
+            os.chdir(cwd)
+
+    def test_jwks(self):
+        """Ensure jwks publishes every public key"""
+        with self.client:
+            response = self.client.get('/auth/.well-known/jwks.json')
+            response_data = json.loads(response.data.decode())
+
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('max-age', response.headers['Cache-Control'])
+            self.assertEqual(
+                sorted(key['kid'] for key in response_data['keys']),
+                ['first', 'second'])
+            for key in response_data['keys']:
+                self.assertNotIn('d', key)
+
 
 class TestLogout(BaseTestCase):
     """Tests for logout"""
@@ -216,6 +478,45 @@ class TestStatus(BaseTestCase):
             )
             self.assertEqual(response.status_code, 200)
 
+    def test_status_not_modified(self):
+        """Ensure status answers 304 to its own ETag"""
+        admin = add_admin()
+        token = login_user(admin)
+        headers = {'Authorization': 'Bearer {}'.format(token)}
+
+        with self.client:
+            response = self.client.get('/auth/status', headers=headers)
+            headers['If-None-Match'] = response.headers['ETag']
+
+            response = self.client.get('/auth/status', headers=headers)
+            self.assertEqual(response.status_code, 304)
+
+    def test_status_etag_depends_on_caller(self):
+        """Ensure status never answers 304 to the ETag of another user"""
+        users = [
+            User(
+                first_name=random_string(),
+                last_name=random_string(),
+                email='{}@test.com'.format(random_string()).lower(),
+                password=random_string(32))
+            for _ in range(2)]
+        # Created in one transaction, both users have the same versions
+        db.session.add_all(users)
+        db.session.commit()
+        etags = []
+
+        for caller in users:
+            headers = {'Authorization': 'Bearer {}'.format(login_user(caller))}
+            if etags:
+                headers['If-None-Match'] = etags[0]
+
+            with self.client:
+                response = self.client.get('/auth/status', headers=headers)
+                self.assertEqual(response.status_code, 200)
+                etags.append(response.headers['ETag'])
+
+        self.assertNotEqual(etags[0], etags[1])
+
     def test_status_with_invalid_token(self):
         """Ensure status with invalid token behaves correctly"""
         with self.client:
@@ -368,6 +669,125 @@ class TestAuthenticate(BaseTestCase):
         self.assertTrue(init_date < expiration_date)
 
 
+class TestAuthorizeBatch(BaseTestCase):
+    """Tests for batch authorization"""
+
+    def do_authorize(self, checks, token):
+        with self.client:
+            return self.client.post(
+                '/auth/authorize',
+                data=json.dumps(checks),
+                headers={'Authorization': 'Bearer {}'.format(token)},
+                content_type='application/json'
+            )
+
+    def test_authorize_batch(self):
+        """Ensure every check is answered in order"""
+        admin = add_admin()
+        user = add_user()
+        token = login_user(admin)
+
+        checks = [
+            {'user_id': admin.id, 'permissions': ['LIST_USERS']},
+            {'user_id': user.id, 'permissions': ['LIST_USERS']},
+            {'token': login_user(admin), 'permissions': ['LIST_USERS']},
+            {'user_id': user.id, 'permissions': []},
+            {'user_id': random.randint(1000, 10000), 'permissions': []},
+        ]
+
+        response = self.do_authorize(checks, token)
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['authorized'] for result in response_data],
+            [True, False, True, True, False])
+        self.assertEqual(response_data[2]['user_id'], admin.id)
+
+    def test_authorize_batch_with_invalid_token(self):
+        """Ensure an invalid token is not authorized"""
+        admin = add_admin()
+
+        checks = [{'token': random_string(16), 'permissions': []}]
+
+        response = self.do_authorize(checks, login_user(admin))
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response_data[0]['authorized'])
+        self.assertIsNone(response_data[0]['user_id'])
+
+    def test_authorize_batch_inactive_user(self):
+        """Ensure an inactive user is not authorized"""
+        admin = add_admin()
+        user = add_user()
+        user.active = False
+        db.session.commit()
+
+        checks = [{'user_id': user.id, 'permissions': []}]
+
+        response = self.do_authorize(checks, login_user(admin))
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response_data[0]['authorized'])
+
+    def test_authorize_batch_invalid_payload(self):
+        """Ensure malformed checks are rejected"""
+        admin = add_admin()
+        token = login_user(admin)
+
+        for checks in [{}, [{'user_id': 1}], [{'permissions': []}]]:
+            response = self.do_authorize(checks, token)
+            self.assertEqual(response.status_code, 400)
+
+    def test_authorize_batch_invalid_token_payload(self):
+        """Ensure tokens that are not strings or not access tokens are
+        rejected"""
+        admin = add_admin()
+        recover_token = jwt.encode({
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+            'sub': admin.email,
+        }, current_app.config['SECRET_KEY'], algorithm='HS256').decode()
+
+        for token in [1234, ['token'], recover_token]:
+            checks = [{'token': token, 'permissions': []}]
+            response = self.do_authorize(checks, login_user(admin))
+            response_data = json.loads(response.data.decode())
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('token', response_data['data'])
+
+    def test_authorize_batch_requires_admin(self):
+        """Ensure only admins can check other users' permissions"""
+        user = add_user()
+        checks = [{'user_id': user.id, 'permissions': []}]
+
+        response = self.do_authorize(checks, login_user(user))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_authorize_batch_too_large(self):
+        """Ensure batches over the configured size are rejected"""
+        admin = add_admin()
+        max_size = current_app.config['AUTHORIZE_BATCH_MAX_SIZE']
+        checks = [{'user_id': admin.id, 'permissions': []}] * (max_size + 1)
+
+        response = self.do_authorize(checks, login_user(admin))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_authorize_batch_without_login(self):
+        """Ensure batch authorization requires authentication"""
+        with self.client:
+            response = self.client.post(
+                '/auth/authorize',
+                data=json.dumps([]),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 401)
+
+
 class TestRecoverPassword(BaseTestCase):
     """Tests for recover password"""
 
@@ -425,6 +845,26 @@ class TestRecoverPassword(BaseTestCase):
                 service.send_called_with['kwargs']['recipients'][0],
                 data['email'])
 
+    def test_recover_password_with_mixed_case_email(self):
+        user = add_user()
+
+        data = {
+            'email': user.email.upper()
+        }
+
+        service = MailerServiceFactory.get_instance().clear()
+
+        with self.client:
+            self.client.post(
+                '/auth/recover-password',
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+
+            self.assertEqual(
+                service.send_called_with['kwargs']['recipients'][0],
+                user.email)
+
     def test_recover_unexisting_user_password(self):
         user = add_user()
 
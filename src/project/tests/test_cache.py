@@ -0,0 +1,72 @@
+import unittest
+
+from project.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    """Tests for TTL cache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_missing_key(self):
+        """Ensure a missing key counts as a miss"""
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_set_and_get(self):
+        """Ensure stored values are returned and count as hits"""
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_expired_entry(self):
+        """Ensure entries expire after ttl seconds"""
+        self.cache.set('key', 'value')
+        self.clock.now = 10
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_custom_ttl(self):
+        """Ensure set accepts a per entry ttl"""
+        self.cache.set('key', 'value', ttl=20)
+        self.clock.now = 15
+
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_evict_least_recently_used(self):
+        """Ensure the least recently used entry is evicted"""
+        self.cache.set('first', 1)
+        self.cache.set('second', 2)
+        self.cache.get('first')
+        self.cache.set('third', 3)
+
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.get('third'), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_delete(self):
+        """Ensure deleted entries are no longer served"""
+        self.cache.set('key', 'value')
+
+        self.assertTrue(self.cache.delete('key'))
+        self.assertFalse(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
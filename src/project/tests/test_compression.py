@@ -0,0 +1,83 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+
+from flask import current_app
+
+from project.tests.base import BaseTestCase
+from project.tests.utils import add_admin, add_permission, login_user
+
+
+class TestCompression(BaseTestCase):
+    """Tests for negotiated response compression"""
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(50):
+            add_permission()
+
+    def __get(self, url, **headers):
+        """Requests without preserving the context and reads the body at
+        once, so a streamed response pops the context it pushed."""
+        response = self.client.get(url, headers=headers)
+        response.get_data()
+
+        return response
+
+    def test_gzip_response(self):
+        """Ensure large bodies are gzipped when the client accepts it"""
+        response = self.__get('/auth/permissions', **{
+            'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(
+            len(json.loads(gzip.decompress(response.data).decode())), 50)
+
+    def test_identity_response(self):
+        """Ensure bodies are not compressed without Accept-Encoding"""
+        response = self.__get('/auth/permissions')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(json.loads(response.data.decode())), 50)
+
+    def test_small_response(self):
+        """Ensure bodies below the size threshold are not compressed"""
+        with patch.dict(current_app.config, {
+                'COMPRESSION_MIN_SIZE': 1024 * 1024}):
+            response = self.__get('/auth/permissions', **{
+                'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_gzip_stream(self):
+        """Ensure NDJSON streams are gzipped chunk by chunk"""
+        token = login_user(add_admin())
+
+        response = self.__get('/users', **{
+            'Authorization': 'Bearer {}'.format(token),
+            'Accept': 'application/x-ndjson',
+            'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_gzip_not_modified(self):
+        """Ensure the ETag of a gzipped body answers 304"""
+        response = self.__get('/auth/permissions', **{
+            'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+
+        response = self.__get('/auth/permissions', **{
+            'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+
+if __name__ == '__main__':
+    unittest.main()
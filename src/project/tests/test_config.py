@@ -57,6 +57,7 @@ class TestTestingConfig(TestCase):
             os.environ.get('DATABASE_TEST_URL'))
         self.assertFalse(app.config['SQLALCHEMY_ECHO'])
         self.assertEqual(app.config['BCRYPT_LOG_ROUNDS'], 4)
+        self.assertFalse(app.config['PRINCIPAL_CACHE_ENABLED'])
 
 
 class TestStagingConfig(TestCase):
@@ -107,6 +108,7 @@ class TestProductionConfig(TestCase):
             os.environ.get('DATABASE_URL'))
         self.assertFalse(app.config['SQLALCHEMY_ECHO'])
         self.assertEqual(app.config['BCRYPT_LOG_ROUNDS'], 13)
+        self.assertTrue(app.config['PRINCIPAL_CACHE_ENABLED'])
 
 
 if __name__ == '__main__':
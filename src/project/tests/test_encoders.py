@@ -0,0 +1,79 @@
+import json
+import datetime
+import unittest
+from unittest.mock import patch
+
+from flask import current_app
+
+from project.encoders import StdlibEncoder, OrjsonEncoder
+from project.tests.base import BaseTestCase
+from project.tests.utils import add_admin, login_user
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DATA = [{
+    'id': 1,
+    'email': 'user@test.com',
+    'created': datetime.datetime(2020, 1, 2, 3, 4, 5, 678),
+    'expiration': datetime.date(2030, 1, 1),
+    'updated': None,
+    'admin': False,
+}]
+
+
+class TestEncoders(BaseTestCase):
+    """Tests for JSON encoders"""
+
+    def setUp(self):
+        super().setUp()
+        self.config = patch.dict(current_app.config, {'DEBUG': False})
+        self.config.start()
+
+    def tearDown(self):
+        self.config.stop()
+        super().tearDown()
+
+    def test_stdlib_dates(self):
+        """Ensure dates are rendered as str() renders them"""
+        data = json.loads(StdlibEncoder().jsonify(DATA).get_data())
+
+        self.assertEqual(data[0]['created'], '2020-01-02 03:04:05.000678')
+        self.assertEqual(data[0]['expiration'], '2030-01-01')
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_matches_stdlib(self):
+        """Ensure orjson encodes the same bytes as the stdlib encoder"""
+        self.assertEqual(
+            OrjsonEncoder().jsonify(DATA).get_data(),
+            StdlibEncoder().jsonify(DATA).get_data())
+        self.assertEqual(
+            OrjsonEncoder().dumps(DATA[0]),
+            json.dumps(DATA[0], default=str, sort_keys=True,
+                       separators=(',', ':')).encode())
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_responses(self):
+        """Ensure responses are encoded with the configured encoder"""
+        admin = add_admin()
+        token = login_user(admin)
+
+        with patch.dict(current_app.config, {
+                'JSON_ENCODER': 'project.encoders.OrjsonEncoder'}):
+            with self.client:
+                response = self.client.get(
+                    '/users/{}'.format(admin.id),
+                    headers={'Authorization': 'Bearer {}'.format(token)}
+                )
+
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['created'], str(admin.created))
+        self.assertEqual(data['updated'], str(admin.updated))
+
+
+if __name__ == '__main__':
+    unittest.main()
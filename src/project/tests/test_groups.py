@@ -4,7 +4,8 @@ import random
 from project.models import Group
 
 from project.tests.base import BaseTestCase
-from project.tests.utils import random_string, add_user, add_group
+from project.tests.utils import (
+    random_string, add_user, add_group, add_user_to_group, count_queries)
 
 
 class TestListGroups(BaseTestCase):
@@ -126,6 +127,64 @@ class TestAddUserToGroup(BaseTestCase):
             self.assertEqual(len(response_data), 1)
 
 
+class TestListGroupUsers(BaseTestCase):
+    """Tests for list group users"""
+
+    def test_paginate_group_users(self):
+        """Ensure group users are paginated"""
+        group = add_group()
+        users = [add_user() for _ in range(3)]
+        add_user()
+        for user in users:
+            add_user_to_group(user, group)
+
+        with self.client:
+            response = self.client.get(
+                '/auth/groups/{}/users?limit=2'.format(group.id),
+                content_type='application/json'
+            )
+            response_data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [user['id'] for user in response_data],
+                [users[0].id, users[1].id])
+
+            response = self.client.get(
+                '/auth/groups/{}/users?limit=2&cursor={}'.format(
+                    group.id, response.headers['X-Next-Cursor']),
+                content_type='application/json'
+            )
+            response_data = json.loads(response.data.decode())
+            self.assertEqual(
+                [user['id'] for user in response_data], [users[2].id])
+            self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_list_group_users_queries(self):
+        """Ensure group users query count does not grow with users"""
+        group = add_group()
+        group_id = group.id
+        url = '/auth/groups/{}/users'.format(group_id)
+
+        for _ in range(3):
+            add_user_to_group(add_user(), group)
+
+        self.client.get(url)
+
+        with count_queries() as before:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data.decode())), 3)
+
+        for _ in range(3):
+            add_user_to_group(add_user(), group)
+
+        with count_queries() as after:
+            response = self.client.get(url)
+        self.assertEqual(len(json.loads(response.data.decode())), 6)
+
+        self.assertEqual(len(after), len(before))
+
+
 class TestDeleteUserFromGroup(BaseTestCase):
     """Tests for delete user from group"""
 
@@ -0,0 +1,225 @@
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import current_app
+
+from project import db
+from project.models import User
+from project.hashing import (
+    HashingExecutor, HashingSaturated, BcryptHasher, Argon2Hasher,
+    check_password, hash_password, needs_rehash)
+from project.tests.base import BaseTestCase
+from project.tests.utils import add_user, random_string
+
+
+class SaturatedExecutor:
+    def run(self, function, *args):
+        raise HashingSaturated
+
+
+class VerifyOnlyExecutor:
+    """Runs the first function, then is saturated."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, function, *args):
+        self.calls += 1
+
+        if self.calls > 1:
+            raise HashingSaturated
+
+        return function(*args)
+
+
+class TestHashingExecutor(unittest.TestCase):
+    """Tests for hashing executor"""
+
+    def test_run(self):
+        """Ensure functions run on the executor and are counted"""
+        executor = HashingExecutor(max_workers=1, max_queue=0)
+
+        self.assertEqual(executor.run(lambda a, b: a + b, 1, 2), 3)
+        self.assertEqual(executor.stats()['completed'], 1)
+        self.assertEqual(executor.stats()['pending'], 0)
+
+    def test_run_saturated(self):
+        """Ensure work beyond workers and queue is rejected"""
+        executor = HashingExecutor(max_workers=1, max_queue=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=executor.run, args=(block,))
+        thread.start()
+        started.wait()
+
+        with self.assertRaises(HashingSaturated):
+            executor.run(lambda: None)
+
+        release.set()
+        thread.join()
+
+        self.assertEqual(executor.stats()['rejected'], 1)
+        self.assertEqual(executor.run(lambda: 'free'), 'free')
+
+    def test_run_saturated_by_request_threads(self):
+        """Ensure concurrent callers past workers and queue are rejected
+        while the others wait for their turn"""
+        executor = HashingExecutor(max_workers=2, max_queue=2)
+        release = threading.Event()
+        results = []
+        lock = threading.Lock()
+
+        def request():
+            try:
+                result = executor.run(release.wait)
+            except HashingSaturated:
+                result = 'rejected'
+
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+
+        while len(results) < 4 or executor.stats()['pending'] < 4:
+            release.wait(0.01)
+
+        self.assertEqual(results, ['rejected'] * 4)
+        self.assertEqual(executor.stats()['pending'], 4)
+        self.assertEqual(executor.stats()['queued'], 2)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 4)
+        self.assertEqual(executor.stats()['rejected'], 4)
+        self.assertEqual(executor.stats()['completed'], 4)
+
+
+class TestHashingSaturated(BaseTestCase):
+    """Tests for saturated hashing responses"""
+
+    def tearDown(self):
+        current_app.extensions.pop('hashing_executor', None)
+        super().tearDown()
+
+    def test_login_when_saturated(self):
+        """Ensure login fails fast with 503 when hashing is saturated"""
+        user = add_user()
+        current_app.extensions['hashing_executor'] = SaturatedExecutor()
+
+        with self.client:
+            response = self.client.post(
+                '/auth/login',
+                data=json.dumps({
+                    'email': user.email,
+                    'password': random_string(16)
+                }),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(
+                response.headers['Retry-After'],
+                str(current_app.config['HASHING_RETRY_AFTER_SECONDS']))
+
+    def test_login_skips_rehash_when_saturated(self):
+        """Ensure a correct password logs in when its rehash is rejected"""
+        password = random_string(16)
+        user = User(
+            first_name=random_string(),
+            last_name=random_string(),
+            email='{}@test.com'.format(random_string()).lower(),
+            password=password)
+        db.session.add(user)
+        db.session.commit()
+        current_app.extensions['hashing_executor'] = VerifyOnlyExecutor()
+
+        with patch.dict(current_app.config, {'PASSWORD_HASHER': 'argon2'}):
+            with self.client:
+                response = self.client.post(
+                    '/auth/login',
+                    data=json.dumps({
+                        'email': user.email, 'password': password}),
+                    content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 200)
+
+        user = User.query.get(user.id)
+        self.assertTrue(user.password.startswith('$2b$'))
+
+
+class TestPasswordHashers(BaseTestCase):
+    """Tests for password hashers"""
+
+    def tearDown(self):
+        current_app.config['PASSWORD_HASHER'] = 'bcrypt'
+        super().tearDown()
+
+    def test_argon2_hash_and_verify(self):
+        """Ensure argon2id hashes verify only the right password"""
+        current_app.config['PASSWORD_HASHER'] = 'argon2'
+        password = random_string(16)
+
+        password_hash = hash_password(password)
+
+        self.assertTrue(password_hash.startswith('$argon2id$'))
+        self.assertTrue(check_password(password_hash, password))
+        self.assertFalse(check_password(password_hash, random_string(16)))
+        self.assertFalse(needs_rehash(password_hash))
+
+    def test_needs_rehash(self):
+        """Ensure hashes of another algorithm or cost need a rehash"""
+        password = random_string(16)
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        bcrypt_hash = BcryptHasher(rounds=rounds).hash(password)
+
+        self.assertFalse(needs_rehash(bcrypt_hash))
+        self.assertTrue(needs_rehash(
+            BcryptHasher(rounds=rounds + 1).hash(password)))
+
+        current_app.config['PASSWORD_HASHER'] = 'argon2'
+
+        self.assertTrue(needs_rehash(bcrypt_hash))
+        self.assertTrue(check_password(bcrypt_hash, password))
+        self.assertTrue(needs_rehash(
+            Argon2Hasher(time_cost=2, memory_cost=1024, parallelism=1).hash(
+                password)))
+
+    def test_login_upgrades_hash(self):
+        """Ensure login rehashes passwords with the preferred hasher"""
+        password = random_string(16)
+        user = User(
+            first_name=random_string(),
+            last_name=random_string(),
+            email='{}@test.com'.format(random_string()).lower(),
+            password=password)
+        db.session.add(user)
+        db.session.commit()
+        self.assertTrue(user.password.startswith('$2b$'))
+
+        current_app.config['PASSWORD_HASHER'] = 'argon2'
+
+        with self.client:
+            response = self.client.post(
+                '/auth/login',
+                data=json.dumps({'email': user.email, 'password': password}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+        user = User.query.get(user.id)
+        self.assertTrue(user.password.startswith('$argon2id$'))
+        self.assertTrue(check_password(user.password, password))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import json
 import unittest
 from project.tests.base import BaseTestCase
+from project.tests.utils import add_admin, add_user, login_user
 
 
 class TestUserServiceHealth(BaseTestCase):
@@ -13,6 +14,30 @@ class TestUserServiceHealth(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('healthy', data['message'])
 
+    def test_metrics(self):
+        """Ensure metrics route reports hashing executor stats."""
+        admin = add_admin()
+
+        response = self.client.get(
+            '/users-service/metrics',
+            headers={'Authorization': 'Bearer {}'.format(login_user(admin))})
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pending', data['hashing_executor'])
+        self.assertEqual(data['hashing_executor']['rejected'], 0)
+
+    def test_metrics_requires_admin(self):
+        """Ensure metrics route is only for admins."""
+        user = add_user()
+
+        response = self.client.get('/users-service/metrics')
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.get(
+            '/users-service/metrics',
+            headers={'Authorization': 'Bearer {}'.format(login_user(user))})
+        self.assertEqual(response.status_code, 403)
+
 
 if __name__ == '__main__':
     unittest.main()
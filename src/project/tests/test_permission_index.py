@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from flask import current_app
+
+from project.permission_index import (
+    PermissionIndex, get_permission_index, permission_mask, permission_codes)
+from project.tests.base import BaseTestCase
+from project.tests.utils import (
+    add_user, add_group, add_permission, add_permission_to_group,
+    add_user_to_group, count_queries)
+
+
+class TestPermissionIndex(unittest.TestCase):
+    """Tests for permission index"""
+
+    def setUp(self):
+        self.index = PermissionIndex({'LIST_USERS': 1, 'EDIT_USERS': 3})
+
+    def test_mask(self):
+        """Ensure codes are converted to a bitmask"""
+        self.assertEqual(self.index.mask([]), 0)
+        self.assertEqual(self.index.mask(['LIST_USERS']), 0b10)
+        self.assertEqual(self.index.mask(['LIST_USERS', 'EDIT_USERS']), 0b1010)
+
+    def test_mask_unknown_code(self):
+        """Ensure unknown codes have no mask"""
+        self.assertIsNone(self.index.mask(['LIST_USERS', 'UNKNOWN']))
+
+    def test_decode(self):
+        """Ensure a bitmask is converted back to codes"""
+        self.assertEqual(self.index.decode(0b1000), ['EDIT_USERS'])
+        self.assertTrue(self.index.covers(0b1010))
+        self.assertFalse(self.index.covers(0b10000))
+
+
+class TestPermissionMask(BaseTestCase):
+    """Tests for permission masks"""
+
+    def test_group_and_user_mask(self):
+        """Ensure groups and users expose their permissions bitmask"""
+        user = add_user()
+        group = add_group()
+        permission = add_permission()
+        add_permission_to_group(permission, group)
+        add_user_to_group(user, group)
+
+        self.assertEqual(group.permission_mask, 1 << permission.id)
+        self.assertEqual(user.permission_mask, 1 << permission.id)
+        self.assertEqual(
+            permission_mask([permission.code]), user.permission_mask)
+
+    def test_index_is_rebuilt_for_new_permissions(self):
+        """Ensure permissions added after the index was loaded are found"""
+        first = add_permission()
+        self.assertIn(first.code, get_permission_index().bits)
+
+        second = add_permission()
+
+        self.assertEqual(
+            permission_mask([second.code]), 1 << second.id)
+        self.assertEqual(
+            permission_codes(1 << second.id), [second.code])
+
+    def test_mask_of_not_existing_permission(self):
+        """Ensure a not existing permission has no mask"""
+        self.assertIsNone(permission_mask(['NOT_EXISTING']))
+
+    def test_unknown_codes_do_not_reload_every_time(self):
+        """Ensure unknown codes and bits reload the index at most once per
+        refresh interval"""
+        add_permission()
+
+        with patch.dict(current_app.config, {
+                'PERMISSION_INDEX_MIN_REFRESH_SECONDS': 60}):
+            self.assertIsNone(permission_mask(['NOT_EXISTING']))
+
+            with count_queries() as statements:
+                self.assertIsNone(permission_mask(['NOT_EXISTING']))
+                self.assertIsNone(permission_mask(['ANOTHER_ONE']))
+                self.assertEqual(permission_codes(1 << 1000), [])
+
+        self.assertEqual(len(statements), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
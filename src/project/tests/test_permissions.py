@@ -1,6 +1,7 @@
 import json
 import random
 
+from project import db
 from project.tests.base import BaseTestCase
 from project.tests.utils import add_group, add_permission
 
@@ -27,6 +28,29 @@ class TestListPermissions(BaseTestCase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(len(response_data), permissions_qty)
 
+    def test_permissions_changed_outside_the_service(self):
+        """Ensure a permission inserted by SQL changes the ETag"""
+        add_permission()
+
+        with self.client:
+            response = self.__get_permissions()
+            etag = response.headers['ETag']
+
+        db.session.execute(
+            "INSERT INTO users.permissions (code, name) "
+            "VALUES ('BY_SQL', 'By SQL')")
+        db.session.commit()
+
+        with self.client:
+            response = self.client.get(
+                'auth/permissions',
+                headers={'If-None-Match': etag},
+                content_type='application/json'
+            )
+            response_data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response_data), 2)
+
 
 class TestAddPermissionToGroup(BaseTestCase):
     """Tests for add permission to group"""
@@ -89,3 +113,60 @@ class TestAddPermissionToGroup(BaseTestCase):
             response_data = json.loads(response.data.decode())
             self.assertEqual(response.status_code, 200)
             self.assertEqual(len(response_data), 0)
+
+
+class TestGroupPermissionsNotModified(BaseTestCase):
+    """Tests for conditional requests of group permissions"""
+
+    def __get_group_permissions(self, group_id, etag):
+        return self.client.get(
+            '/auth/groups/{}/permissions'.format(group_id),
+            headers={'If-None-Match': etag},
+            content_type='application/json'
+        )
+
+    def test_group_permissions_not_modified(self):
+        """Ensure group permissions answer 304 until they change"""
+        permission = add_permission()
+        group = add_group()
+
+        with self.client:
+            response = self.__get_group_permissions(group.id, '"none"')
+            etag = response.headers['ETag']
+            self.assertEqual(response.status_code, 200)
+
+            response = self.__get_group_permissions(group.id, etag)
+            self.assertEqual(response.status_code, 304)
+
+            self.client.post(
+                '/auth/groups/{}/permissions'.format(group.id),
+                data=json.dumps({'code': permission.code}),
+                content_type='application/json'
+            )
+
+            response = self.__get_group_permissions(group.id, etag)
+            response_data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response_data), 1)
+
+    def test_group_permissions_changed_outside_the_service(self):
+        """Ensure group permissions removed by SQL change the ETag"""
+        permission = add_permission()
+        group = add_group()
+        group.permissions.append(permission)
+        db.session.commit()
+
+        with self.client:
+            response = self.__get_group_permissions(group.id, '"none"')
+            etag = response.headers['ETag']
+
+        db.session.execute(
+            "DELETE FROM users.group_permissions WHERE group_id = :id",
+            {'id': group.id})
+        db.session.commit()
+
+        with self.client:
+            response = self.__get_group_permissions(group.id, etag)
+            response_data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response_data), 0)
@@ -0,0 +1,209 @@
+import json
+import random
+import unittest
+
+from flask import current_app
+
+from project.principals import (
+    load_principal, get_principal, resolve_principal)
+from project.serializers import TokenSerializer
+from project.tests.base import BaseTestCase
+from project.tests.utils import (
+    add_user, add_group, add_permission, add_permission_to_group,
+    add_user_to_group, add_admin, login_user)
+
+
+class TestLoadPrincipal(BaseTestCase):
+    """Tests for principal loading"""
+
+    def test_load_principal(self):
+        """Ensure principal carries the user authentication data"""
+        user = add_user(admin=True)
+
+        principal = load_principal(user.id)
+
+        self.assertEqual(principal.id, user.id)
+        self.assertTrue(principal.active)
+        self.assertTrue(principal.admin)
+        self.assertIsNone(principal.expiration)
+        self.assertEqual(principal.permissions, [])
+
+    def test_load_not_existing_principal(self):
+        """Ensure loading a not existing user returns None"""
+        self.assertIsNone(load_principal(random.randint(1, 10000)))
+
+    def test_load_principal_permissions(self):
+        """Ensure principal aggregates permissions from every group"""
+        user = add_user()
+        codes = set()
+
+        for i in range(0, random.randint(2, 4)):
+            group = add_group()
+            for j in range(0, random.randint(1, 5)):
+                permission = add_permission()
+                add_permission_to_group(permission, group)
+                codes.add(permission.code)
+            add_user_to_group(user, group)
+
+        principal = load_principal(user.id)
+
+        self.assertEqual(set(principal.permissions), codes)
+        self.assertTrue(principal.is_authorized(list(codes)))
+        self.assertFalse(principal.is_authorized(['NOT_GRANTED']))
+
+    def test_load_principal_shared_permission(self):
+        """Ensure a permission granted by two groups is listed once"""
+        user = add_user()
+        permission = add_permission(code='LIST_USERS')
+
+        for i in range(0, 2):
+            group = add_group()
+            add_permission_to_group(permission, group)
+            add_user_to_group(user, group)
+
+        principal = load_principal(user.id)
+
+        self.assertEqual(principal.permissions, ['LIST_USERS'])
+
+
+class TestPrincipalCache(BaseTestCase):
+    """Tests for principal cache"""
+
+    def setUp(self):
+        super().setUp()
+        current_app.config['PRINCIPAL_CACHE_ENABLED'] = True
+        current_app.extensions.pop('principal_cache', None)
+
+    def tearDown(self):
+        current_app.config['PRINCIPAL_CACHE_ENABLED'] = False
+        current_app.extensions.pop('principal_cache', None)
+        super().tearDown()
+
+    def __get_stats(self):
+        return current_app.extensions['principal_cache'].stats()
+
+    def test_get_principal_is_cached(self):
+        """Ensure a principal is loaded once while cached"""
+        user = add_user()
+
+        get_principal(user.id)
+        get_principal(user.id)
+
+        self.assertEqual(self.__get_stats()['misses'], 1)
+        self.assertEqual(self.__get_stats()['hits'], 1)
+
+    def test_deactivate_invalidates_principal(self):
+        """Ensure a deactivated user is not served from cache"""
+        admin = add_admin()
+        user = add_user()
+        token = login_user(user)
+
+        self.assertTrue(get_principal(user.id).active)
+
+        with self.client:
+            self.client.put(
+                '/users/{}/deactivate'.format(user.id),
+                headers={'Authorization': 'Bearer {}'.format(
+                    login_user(admin))},
+                content_type='application/json'
+            )
+            response = self.client.get(
+                '/auth/status',
+                headers={'Authorization': 'Bearer {}'.format(token)},
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 403)
+
+    def test_add_permission_invalidates_group_principals(self):
+        """Ensure adding a permission to a group refreshes its users"""
+        user = add_user()
+        group = add_group()
+        add_user_to_group(user, group)
+        permission = add_permission()
+
+        self.assertFalse(
+            get_principal(user.id).is_authorized([permission.code]))
+
+        with self.client:
+            response = self.client.post(
+                '/auth/groups/{}/permissions'.format(group.id),
+                data=json.dumps({'code': permission.code}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertTrue(
+            get_principal(user.id).is_authorized([permission.code]))
+
+    def test_delete_group_invalidates_group_principals(self):
+        """Ensure deleting a group refreshes its former users"""
+        user = add_user()
+        group = add_group()
+        permission = add_permission()
+        add_permission_to_group(permission, group)
+        add_user_to_group(user, group)
+
+        self.assertTrue(
+            get_principal(user.id).is_authorized([permission.code]))
+
+        with self.client:
+            response = self.client.delete(
+                '/auth/groups/{}'.format(group.id),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 204)
+
+        self.assertFalse(
+            get_principal(user.id).is_authorized([permission.code]))
+
+
+class TestPermissionClaims(BaseTestCase):
+    """Tests for permission claims embedded in tokens"""
+
+    def setUp(self):
+        super().setUp()
+        current_app.config['TOKEN_PERMISSION_CLAIMS'] = True
+
+    def tearDown(self):
+        current_app.config['TOKEN_PERMISSION_CLAIMS'] = False
+        super().tearDown()
+
+    def test_token_contains_permission_claims(self):
+        """Ensure tokens carry the permission mask and version"""
+        admin = add_admin()
+
+        payload = TokenSerializer.decode(login_user(admin))
+
+        self.assertEqual(int(payload['pm'], 16), admin.permission_mask)
+        self.assertEqual(payload['pv'], admin.permissions_version)
+
+    def test_resolve_principal_from_claims(self):
+        """Ensure a current token is authorized from its claims"""
+        admin = add_admin()
+
+        principal = resolve_principal(
+            TokenSerializer.decode(login_user(admin)))
+
+        self.assertTrue(principal.is_authorized(['LIST_USERS']))
+
+    def test_stale_claims_are_reloaded(self):
+        """Ensure a removed permission is not served from stale claims"""
+        admin = add_admin()
+        group = admin.groups[0]
+        token = login_user(admin)
+
+        with self.client:
+            self.client.delete(
+                '/auth/groups/{}/permissions/LIST_USERS'.format(group.id),
+                content_type='application/json'
+            )
+            response = self.client.get(
+                '/users',
+                headers={'Authorization': 'Bearer {}'.format(token)},
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -160,5 +160,40 @@ class TestLengthRule(BaseTestCase):
                     .format(max))
 
 
+class TestStringRule(BaseTestCase):
+    """Tests for String Validator"""
+
+    def setUp(self):
+        class MockValidator(BaseValidator):
+            def get_rules(self):
+                return {
+                    'test_field': [rules.String()]
+                }
+
+        class MockLogics:
+            @validate(MockValidator)
+            def execute(self, data):
+                pass
+
+        self.logics = MockLogics()
+
+    def test_with_string(self):
+        """Ensure string rule accepts strings and missing values"""
+        for data in [{'test_field': 'value'}, {'test_field': None}, {}]:
+            self.logics.execute(data)
+
+        self.assertTrue(True)
+
+    def test_without_string(self):
+        """Ensure string rule rejects values that are not strings"""
+        for value in [1, ['value'], {'value': 1}]:
+            with self.assertRaises(ValidatorException) as context:
+                self.logics.execute({'test_field': value})
+
+            self.assertEqual(
+                context.exception.errors['test_field'],
+                'test field must be a string.')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,207 @@
+import json
+import unittest
+
+from flask import current_app
+
+from project.hashing import get_hashing_executor
+from project.throttling import (
+    BucketStore, MemoryBucketStore, LoginThrottle, LoginThrottled)
+from project.views.utils import client_ip
+from project.tests.base import BaseTestCase
+from project.tests.utils import add_user, random_string
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoryBucketStore(unittest.TestCase):
+    """Tests for in memory token buckets"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = MemoryBucketStore(max_size=2, clock=self.clock)
+
+    def test_take_until_empty(self):
+        """Ensure a bucket allows capacity takes and then rejects"""
+        self.assertEqual(self.store.take('key', 2, 10), 0)
+        self.assertEqual(self.store.take('key', 2, 10), 0)
+        self.assertEqual(self.store.take('key', 2, 10), 10)
+
+    def test_refill(self):
+        """Ensure tokens are refilled over time"""
+        self.store.take('key', 1, 10)
+        self.clock.now = 5
+
+        self.assertEqual(self.store.take('key', 1, 10), 5)
+
+        self.clock.now = 15
+        self.assertEqual(self.store.take('key', 1, 10), 0)
+
+    def test_max_size(self):
+        """Ensure the least recently used bucket is dropped"""
+        self.store.take('first', 1, 10)
+        self.store.take('second', 1, 10)
+        self.store.take('third', 1, 10)
+
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.take('first', 1, 10), 0)
+
+    def test_store_interface(self):
+        """Ensure stores must implement take and clear"""
+        class IncompleteStore(BucketStore):
+            def clear(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            IncompleteStore()
+
+
+class TestLoginThrottle(unittest.TestCase):
+    """Tests for login throttle"""
+
+    def setUp(self):
+        self.throttle = LoginThrottle(
+            MemoryBucketStore(clock=FakeClock()),
+            ip_capacity=3, ip_refill_seconds=10,
+            email_capacity=1, email_refill_seconds=60)
+
+    def test_throttle_by_email(self):
+        """Ensure attempts against one email are limited"""
+        self.throttle.check('10.0.0.1', 'user@test.com')
+
+        with self.assertRaises(LoginThrottled) as context:
+            self.throttle.check('10.0.0.2', 'user@test.com')
+
+        self.assertEqual(context.exception.retry_after, 60)
+        self.assertEqual(self.throttle.rejected_email, 1)
+
+    def test_throttle_by_ip(self):
+        """Ensure attempts from one ip are limited across emails"""
+        for index in range(3):
+            self.throttle.check('10.0.0.1', '{}@test.com'.format(index))
+
+        with self.assertRaises(LoginThrottled):
+            self.throttle.check('10.0.0.1', 'other@test.com')
+
+        self.assertEqual(self.throttle.allowed, 3)
+        self.assertEqual(self.throttle.rejected_ip, 1)
+
+
+class TestLoginThrottling(BaseTestCase):
+    """Tests for throttled login"""
+
+    def setUp(self):
+        super().setUp()
+        current_app.config['LOGIN_THROTTLE_EMAIL_CAPACITY'] = 1
+
+    def tearDown(self):
+        current_app.config['LOGIN_THROTTLE_EMAIL_CAPACITY'] = 5
+        super().tearDown()
+
+    def do_login(self, email):
+        with self.client:
+            return self.client.post(
+                '/auth/login',
+                data=json.dumps({
+                    'email': email,
+                    'password': random_string(16)
+                }),
+                content_type='application/json'
+            )
+
+    def test_login_throttled(self):
+        """Ensure throttled logins fail with 429 before hashing"""
+        user = add_user()
+        self.assertEqual(self.do_login(user.email).status_code, 400)
+        completed = get_hashing_executor().stats()['completed']
+
+        response = self.do_login(user.email.upper())
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(
+            response_data['message'], 'too many login attempts.')
+        self.assertEqual(response.headers['Retry-After'], '60')
+        self.assertEqual(
+            get_hashing_executor().stats()['completed'], completed)
+
+    def test_login_throttle_disabled(self):
+        """Ensure logins are not throttled when disabled"""
+        current_app.config['LOGIN_THROTTLE_ENABLED'] = False
+        user = add_user()
+
+        try:
+            for _ in range(2):
+                self.assertEqual(self.do_login(user.email).status_code, 400)
+        finally:
+            current_app.config['LOGIN_THROTTLE_ENABLED'] = True
+
+    def test_login_throttled_by_forwarded_ip(self):
+        """Ensure logins behind a proxy are throttled per client ip"""
+        current_app.config['TRUSTED_PROXY_COUNT'] = 1
+        current_app.config['LOGIN_THROTTLE_IP_CAPACITY'] = 1
+
+        def do_login(forwarded_for):
+            with self.client:
+                return self.client.post(
+                    '/auth/login',
+                    data=json.dumps({
+                        'email': '{}@test.com'.format(random_string()),
+                        'password': random_string(16)
+                    }),
+                    headers={'X-Forwarded-For': forwarded_for},
+                    content_type='application/json'
+                )
+
+        try:
+            self.assertEqual(do_login('10.0.0.1').status_code, 404)
+            self.assertEqual(do_login('10.0.0.2').status_code, 404)
+            self.assertEqual(
+                do_login('10.0.0.2, 10.0.0.1').status_code, 429)
+        finally:
+            current_app.config['TRUSTED_PROXY_COUNT'] = 0
+            current_app.config['LOGIN_THROTTLE_IP_CAPACITY'] = 20
+
+
+class TestClientIp(BaseTestCase):
+    """Tests for the client ip behind trusted proxies"""
+
+    def get_client_ip(self, proxies, forwarded_for=None):
+        current_app.config['TRUSTED_PROXY_COUNT'] = proxies
+        headers = {}
+        if forwarded_for is not None:
+            headers['X-Forwarded-For'] = forwarded_for
+
+        try:
+            with self.app.test_request_context(
+                    headers=headers,
+                    environ_base={'REMOTE_ADDR': '172.20.0.1'}):
+                return client_ip()
+        finally:
+            current_app.config['TRUSTED_PROXY_COUNT'] = 0
+
+    def test_without_proxies(self):
+        """Ensure forwarded addresses are ignored without trusted proxies"""
+        self.assertEqual(self.get_client_ip(0, '10.0.0.1'), '172.20.0.1')
+
+    def test_behind_proxies(self):
+        """Ensure the client is taken that many entries from the right"""
+        self.assertEqual(
+            self.get_client_ip(1, '1.1.1.1, 10.0.0.1'), '10.0.0.1')
+        self.assertEqual(
+            self.get_client_ip(2, '1.1.1.1, 10.0.0.1, 10.0.0.2'),
+            '10.0.0.1')
+
+    def test_missing_forwarded_for(self):
+        """Ensure the peer address is used when proxies added nothing"""
+        self.assertEqual(self.get_client_ip(1), '172.20.0.1')
+        self.assertEqual(self.get_client_ip(2, '10.0.0.1'), '172.20.0.1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
 import json
+import base64
 import random
 import datetime
 import unittest
+from unittest.mock import patch
+
+from flask import current_app
+from sqlalchemy import exc
 
 from project.tests.utils import (
-    random_string, add_user, login_user, add_admin, add_permissions)
+    random_string, add_user, login_user, add_admin, add_permissions,
+    add_group, add_user_to_group, count_queries)
 
 from project import db, bcrypt
 from project.tests.base import BaseTestCase
@@ -128,6 +134,467 @@ class TestListUsers(BaseTestCase):
             self.assertEqual(response.status_code, 200)
 
 
+class TestPaginateUsers(BaseTestCase):
+    """Tests for paginated, filtered and sorted user lists"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+
+    def __get_users(self, query_string):
+        with self.client:
+            return self.client.get(
+                '/users?{}'.format(query_string),
+                headers={'Authorization': 'Bearer {}'.format(self.token)},
+                content_type='application/json'
+            )
+
+    def __get_all_pages(self, query_string):
+        pages = []
+        response = self.__get_users(query_string)
+
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([
+                user['id'] for user in json.loads(response.data.decode())])
+
+            if 'X-Next-Cursor' not in response.headers:
+                return pages
+
+            response = self.__get_users('{}&cursor={}'.format(
+                query_string, response.headers['X-Next-Cursor']))
+
+    def test_paginate_users(self):
+        """Ensure users are returned in pages following the cursor"""
+        for _ in range(4):
+            add_user()
+
+        pages = self.__get_all_pages('limit=2')
+
+        ids = [user.id for user in User.query.order_by(User.id)]
+        self.assertEqual(pages, [ids[0:2], ids[2:4], ids[4:5]])
+
+    def test_paginate_users_sorted_descending(self):
+        """Ensure pages follow a descending sort with ties broken by id"""
+        for _ in range(4):
+            user = add_user()
+            user.last_name = 'last name'
+            db.session.commit()
+
+        pages = self.__get_all_pages('limit=2&sort=-last_name')
+
+        ids = [
+            user.id for user in User.query.order_by(
+                User.last_name.desc(), User.id.desc())]
+        self.assertEqual(sum(pages, []), ids)
+
+    def test_filter_users(self):
+        """Ensure users are filtered by admin and active"""
+        add_user(admin=True)
+        inactive = add_user()
+        inactive.active = False
+        db.session.commit()
+
+        response = self.__get_users('admin=true')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(len(response_data), 2)
+
+        response = self.__get_users('active=false')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [user['id'] for user in response_data], [inactive.id])
+
+    def test_filter_users_by_expiration(self):
+        """Ensure users are filtered by expiration range"""
+        expiring = add_user()
+        expiring.expiration = datetime.date(2030, 1, 15)
+        db.session.commit()
+
+        response = self.__get_users(
+            'expiration_from=2030-01-01&expiration_to=2030-01-31')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [user['id'] for user in response_data], [expiring.id])
+
+        response = self.__get_users('expiration_from=2030-02-01')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(len(response_data), 0)
+
+    def test_filter_users_by_status(self):
+        """Ensure users are filtered by their effective status"""
+        expired = add_user()
+        expired.expiration = datetime.date.today() - datetime.timedelta(
+            days=1)
+        inactive = add_user()
+        inactive.active = False
+        expiring = add_user()
+        expiring.expiration = datetime.date.today() + datetime.timedelta(
+            days=1)
+        db.session.commit()
+
+        response = self.__get_users('status=true')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [user['id'] for user in response_data],
+            [self.admin.id, expiring.id])
+        self.assertTrue(all(user['active'] for user in response_data))
+
+        response = self.__get_users('status=false')
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [user['id'] for user in response_data],
+            [expired.id, inactive.id])
+        self.assertFalse(any(user['active'] for user in response_data))
+
+    def test_invalid_parameters(self):
+        """Ensure invalid pagination parameters are rejected"""
+        response = self.__get_users('limit=0&sort=password&cursor=invalid')
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response_data['message'], 'invalid parameters.')
+        self.assertEqual(
+            sorted(response_data['data']), ['cursor', 'limit', 'sort'])
+
+    def test_tampered_cursor(self):
+        """Ensure cursors whose value does not match the sort column are
+        rejected"""
+        cursors = [
+            ('id', ['id', 'abc', 1]),
+            ('last_name', ['last_name', 5, 1]),
+            ('created', ['created', 5, 1]),
+            ('email', ['email', 'user@test.com', 'abc']),
+        ]
+
+        for sort, cursor in cursors:
+            cursor = base64.urlsafe_b64encode(json.dumps(cursor).encode())
+            response = self.__get_users('sort={}&cursor={}'.format(
+                sort, cursor.decode()))
+            response_data = json.loads(response.data.decode())
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(response_data['data']), ['cursor'])
+
+    def test_sort_with_several_minus_signs(self):
+        """Ensure only a single leading minus sign is accepted"""
+        response = self.__get_users('sort=--id')
+        response_data = json.loads(response.data.decode())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response_data['data']), ['sort'])
+
+
+class TestListUsersQueries(BaseTestCase):
+    """Tests for queries run by user lists"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+        self.group = add_group()
+
+    def __add_users(self):
+        for _ in range(3):
+            user = add_user(admin=True)
+            add_user_to_group(user, self.group)
+
+    def __get(self, url):
+        with self.client:
+            response = self.client.get(
+                url,
+                headers={'Authorization': 'Bearer {}'.format(self.token)},
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def __count_queries(self, url):
+        with count_queries() as statements:
+            self.__get(url)
+
+        return len(statements)
+
+    def __assert_constant_queries(self, url):
+        """Ensure url runs as many queries after adding users as before.
+        The first request warms the per app caches."""
+        self.__add_users()
+        self.__get(url)
+        before = self.__count_queries(url)
+
+        self.__add_users()
+
+        self.assertEqual(self.__count_queries(url), before)
+
+    def test_list_users_queries(self):
+        """Ensure list users query count does not grow with users"""
+        self.__assert_constant_queries('/users')
+
+    def test_list_admins_queries(self):
+        """Ensure list admins query count does not grow with users"""
+        self.__assert_constant_queries('/users/admins')
+
+    def test_filter_by_ids_queries(self):
+        """Ensure users by ids query count does not grow with users"""
+        ids = ','.join(str(id) for id in range(1, 20))
+
+        self.__assert_constant_queries('/users/byIds/{}'.format(ids))
+
+    def test_list_users_does_not_load_passwords(self):
+        """Ensure user lists never select password hashes"""
+        self.__add_users()
+        ids = ','.join(str(id) for id in range(1, 20))
+
+        with count_queries() as statements:
+            self.__get('/users')
+            self.__get('/users/byIds/{}'.format(ids))
+
+        self.assertTrue(statements)
+        for statement in statements:
+            self.assertNotIn('password', statement)
+
+
+class TestStreamUsers(BaseTestCase):
+    """Tests for streamed user lists"""
+
+    def setUp(self):
+        super().setUp()
+        current_app.config['USERS_STREAM_CHUNK_SIZE'] = 2
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+        for _ in range(4):
+            add_user()
+
+    def tearDown(self):
+        current_app.config['USERS_STREAM_CHUNK_SIZE'] = 500
+        super().tearDown()
+
+    def __get_users(self, query_string='', accept='application/json'):
+        """Requests without preserving the context and reads the body at
+        once. The streamed body pushes the request context again and only
+        pops it when fully read, which a preserved context never does."""
+        response = self.client.get(
+            '/users?{}'.format(query_string),
+            headers={
+                'Authorization': 'Bearer {}'.format(self.token),
+                'Accept': accept
+            },
+            content_type='application/json'
+        )
+        response.get_data()
+
+        return response
+
+    def test_stream_json_array(self):
+        """Ensure streamed users match the regular list"""
+        expected = json.loads(self.__get_users().data.decode())
+
+        response = self.__get_users('stream=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data.decode()), expected)
+
+    def test_stream_ndjson(self):
+        """Ensure users are streamed one per line as NDJSON"""
+        expected = json.loads(self.__get_users('sort=-id').data.decode())
+
+        response = self.__get_users('sort=-id', 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+        self.assertEqual(lines[0], json.dumps(
+            expected[0], sort_keys=True, separators=(',', ':')))
+
+    def test_stream_invalid_parameters(self):
+        """Ensure invalid parameters are rejected before streaming"""
+        response = self.__get_users('stream=true&sort=password')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestUserFields(BaseTestCase):
+    """Tests for sparse user fieldsets"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+
+    def __get(self, url):
+        with self.client:
+            return self.client.get(
+                url,
+                headers={'Authorization': 'Bearer {}'.format(self.token)},
+                content_type='application/json'
+            )
+
+    def test_filter_by_ids_fields(self):
+        """Ensure only the requested fields are selected and returned"""
+        user = add_user()
+
+        with count_queries() as statements:
+            response = self.__get(
+                '/users/byIds/{}?fields=id,first_name,last_name,email'.format(
+                    user.id))
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_data, [{
+            'id': user.id,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email
+        }])
+        self.assertNotIn('created', statements[-1])
+        self.assertNotIn('group_users', statements[-1])
+
+    def test_list_users_fields(self):
+        """Ensure user lists return only the requested fields"""
+        add_user()
+
+        response = self.__get('/users?fields=id,active&limit=1')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response_data, [{'id': self.admin.id, 'active': True}])
+        self.assertIn('X-Next-Cursor', response.headers)
+
+    def test_get_user_fields(self):
+        """Ensure a single user returns only the requested fields"""
+        response = self.__get('/users/{}?fields=email'.format(self.admin.id))
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response_data, {'email': self.admin.email})
+
+    def test_unknown_fields(self):
+        """Ensure unknown fields are rejected"""
+        response = self.__get('/users?fields=id,password')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response_data['message'], 'invalid parameters.')
+        self.assertIn('fields', response_data['data'])
+
+
+class TestSearchUsers(BaseTestCase):
+    """Tests for user search"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+
+    def __add_user(self, first_name, last_name, email):
+        user = User(
+            first_name=first_name,
+            last_name=last_name,
+            email=email,
+            password=random_string(32))
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def __search(self, query_string):
+        with self.client:
+            return self.client.get(
+                '/users/search?{}'.format(query_string),
+                headers={'Authorization': 'Bearer {}'.format(self.token)},
+                content_type='application/json'
+            )
+
+    def test_search_ignores_case_and_accents(self):
+        """Ensure search matches names regardless of case and accents"""
+        user = self.__add_user('José', 'Núñez', 'jose@test.com')
+        self.__add_user('Pedro', 'Soto', 'pedro@test.com')
+
+        response = self.__search('q=NUNEZ')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u['id'] for u in response_data], [user.id])
+
+    def test_search_substring(self):
+        """Ensure search matches substrings of names and emails"""
+        by_name = self.__add_user('Ana', 'Valenzuela', 'ana@test.com')
+        by_email = self.__add_user('Pedro', 'Rojas', 'pzuela@test.com')
+
+        response = self.__search('q=zuela')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            sorted(u['id'] for u in response_data),
+            sorted([by_name.id, by_email.id]))
+
+    def test_search_ranks_prefix_matches_first(self):
+        """Ensure users with a field starting with the term come first"""
+        substring = self.__add_user('Mariandrea', 'Soto', 'msoto@test.com')
+        prefix = self.__add_user('Andrea', 'Rojas', 'arojas@test.com')
+
+        response = self.__search('q=andrea')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [u['id'] for u in response_data], [prefix.id, substring.id])
+
+    def test_search_escapes_wildcards(self):
+        """Ensure like wildcards in the term are matched literally"""
+        self.__add_user('Pedro', 'Soto', 'pedro@test.com')
+
+        response = self.__search('q=%25%25%25')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response_data, [])
+
+    def test_search_limit_and_fields(self):
+        """Ensure search honours limit and fields"""
+        for _ in range(3):
+            self.__add_user('Ana', random_string(), '{}@test.com'.format(
+                random_string(16)))
+
+        response = self.__search('q=ana&limit=2&fields=id,first_name')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(len(response_data), 2)
+        self.assertEqual(sorted(response_data[0]), ['first_name', 'id'])
+
+    def test_search_invalid_parameters(self):
+        """Ensure a missing term and an out of range limit are rejected"""
+        response = self.__search('q=%20&limit=1000')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response_data['data']), ['limit', 'q'])
+
+    def test_search_ranks_capped_candidates(self):
+        """Ensure only USERS_SEARCH_MAX_CANDIDATES matches are ranked"""
+        for _ in range(3):
+            self.__add_user('Ana', random_string(), '{}@test.com'.format(
+                random_string(16)))
+
+        with patch.dict(current_app.config, {
+                'USERS_SEARCH_MAX_CANDIDATES': 2}):
+            response = self.__search('q=ana')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response_data), 2)
+
+    def test_search_short_term(self):
+        """Ensure terms shorter than a trigram are rejected"""
+        self.__add_user('Ana', 'Soto', 'ana@test.com')
+
+        response = self.__search('q=an')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response_data['data'],
+            {'q': 'q must be at least 3 characters long.'})
+
+
 class TestListAdmins(BaseTestCase):
     """Tests for list admins"""
 
@@ -355,6 +822,21 @@ class TestAddUser(BaseTestCase):
             self.assertEqual(response.status_code, 400)
             self.assertEqual(response_data['message'], 'duplicate user.')
 
+    def test_duplicate_email_differing_in_case(self):
+        """Ensure the database rejects emails differing only in case"""
+        user = add_user()
+
+        db.session.add(User(
+            first_name=random_string(),
+            last_name=random_string(),
+            email=user.email.upper(),
+            password=random_string()))
+
+        with self.assertRaises(exc.IntegrityError):
+            db.session.commit()
+
+        db.session.rollback()
+
     def test_add_user_without_first_name(self):
         """Ensure create user route behaves correctly without first_name"""
         user_data = {
@@ -1752,6 +2234,42 @@ class TestViewUser(BaseTestCase):
             self.assertEqual(data['expiration'], user.expiration)
             self.assertIsNotNone(data['hash'])
 
+    def test_view_user_not_modified(self):
+        """Ensure a matching ETag answers 304 until the user changes"""
+        user = self.__add_user(**self.__get_random_user_data())
+        admin = add_admin()
+        token = login_user(admin)
+
+        def get(etag=None):
+            headers = {'Authorization': 'Bearer {}'.format(token)}
+            if etag is not None:
+                headers['If-None-Match'] = etag
+            return self.client.get(
+                '/users/{}'.format(user.id),
+                headers=headers,
+                content_type='application/json'
+            )
+
+        with self.client:
+            response = get()
+            etag = response.headers['ETag']
+            self.assertEqual(response.status_code, 200)
+
+            response = get(etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+
+            self.client.put(
+                '/users/{}/deactivate'.format(user.id),
+                headers={'Authorization': 'Bearer {}'.format(token)},
+                content_type='application/json'
+            )
+
+            response = get(etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
     def test_view_with_non_existing_user(self):
         """Ensure view behaves correctly when user doesn't exist"""
         admin = add_admin()
@@ -2028,6 +2546,98 @@ class TestFilterUsersById(BaseTestCase):
             self.assertEqual(len(response_data), 2)
 
 
+class TestLookupUsers(BaseTestCase):
+    """Tests for bulk user lookup"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = add_admin()
+        self.token = login_user(self.admin)
+
+    def __lookup(self, data, query_string=''):
+        with self.client:
+            return self.client.post(
+                '/users/lookup{}'.format(query_string),
+                data=json.dumps(data),
+                headers={'Authorization': 'Bearer {}'.format(self.token)},
+                content_type='application/json'
+            )
+
+    def test_lookup_ids_in_request_order(self):
+        """Ensure ids are deduplicated and answered in request order"""
+        user1 = add_user()
+        user2 = add_user()
+
+        response = self.__lookup(
+            [user2.id, user1.id + 1000, user1.id, user2.id])
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [entry['id'] for entry in response_data],
+            [user2.id, user1.id + 1000, user1.id])
+        self.assertEqual(response_data[0]['user']['id'], user2.id)
+        self.assertIsNone(response_data[1]['user'])
+        self.assertEqual(response_data[2]['user']['id'], user1.id)
+
+    def test_lookup_emails(self):
+        """Ensure emails are looked up regardless of case"""
+        user = add_user()
+
+        response = self.__lookup(
+            {'emails': [user.email.upper(), 'missing@test.com']},
+            '?fields=id')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response_data, [
+            {'email': user.email.upper(), 'user': {'id': user.id}},
+            {'email': 'missing@test.com', 'user': None},
+        ])
+
+    def test_lookup_emails_folded_by_database(self):
+        """Ensure every spelling of an email is answered by its own entry"""
+        user = add_user()
+        emails = [user.email.upper(), user.email.title(), user.email]
+
+        with patch.dict(current_app.config, {'USERS_LOOKUP_CHUNK_SIZE': 2}):
+            response = self.__lookup({'emails': emails}, '?fields=id')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response_data, [
+            {'email': email, 'user': {'id': user.id}} for email in emails])
+
+    def test_lookup_in_chunks(self):
+        """Ensure large lookups are split in bounded queries"""
+        ids = [add_user().id for _ in range(4)] + [self.admin.id]
+
+        with patch.dict(current_app.config, {'USERS_LOOKUP_CHUNK_SIZE': 2}):
+            with count_queries() as statements:
+                response = self.__lookup(ids, '?fields=id')
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(
+            [entry['user']['id'] for entry in response_data], ids)
+        self.assertEqual(
+            len([s for s in statements if 'users.users.id IN' in s]), 3)
+
+    def test_lookup_too_many(self):
+        """Ensure lookups above the maximum batch size are rejected"""
+        with patch.dict(current_app.config, {'USERS_LOOKUP_MAX_SIZE': 2}):
+            response = self.__lookup([1, 2, 3])
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response_data['data'])
+
+    def test_lookup_invalid_ids(self):
+        """Ensure ids must be integers"""
+        response = self.__lookup({'ids': ['1', True]})
+
+        response_data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response_data['data'])
+
+
 class TestUpdatePassword(BaseTestCase):
     """Tests for update user password"""
 
@@ -1,5 +1,8 @@
 import random
 import string
+from contextlib import contextmanager
+
+from sqlalchemy import event
 
 from project import db
 
@@ -73,3 +76,18 @@ def random_string(length=32):
             string.ascii_letters + string.digits
         ) for n in range(length)]
     )
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(
+            db.engine, 'before_cursor_execute', before_cursor_execute)
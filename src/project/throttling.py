@@ -0,0 +1,156 @@
+import abc
+import time
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+from project.hashing import get_hashing_executor
+
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class BucketStore(abc.ABC):
+    """Storage for token buckets.
+
+    take() must refill and consume a bucket atomically. Shared stores
+    (e.g. redis running a script) let every worker see the same buckets;
+    the memory store only limits attempts hitting the same process.
+    """
+
+    @abc.abstractmethod
+    def take(self, key, capacity, refill_seconds):
+        """Consumes a token from key.
+
+        Returns zero when a token was available, otherwise the seconds
+        until the next one.
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """Drops every bucket."""
+
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, max_size=65536, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self.__buckets = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def take(self, key, capacity, refill_seconds):
+        with self.__lock:
+            now = self.clock()
+            tokens, updated = self.__buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) / refill_seconds)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) * refill_seconds
+
+            self.__buckets[key] = (tokens, now)
+            self.__buckets.move_to_end(key)
+
+            if len(self.__buckets) > self.max_size:
+                self.__buckets.popitem(last=False)
+
+            return retry_after
+
+    def clear(self):
+        with self.__lock:
+            self.__buckets.clear()
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__buckets)
+
+
+class LoginThrottle:
+    """Token buckets per client ip and per email in front of login.
+
+    Throttled attempts are rejected before the user is looked up, so every
+    rejection is a password verify that never ran.
+    """
+
+    def __init__(self, store, ip_capacity, ip_refill_seconds,
+                 email_capacity, email_refill_seconds):
+        self.store = store
+        self.ip_capacity = ip_capacity
+        self.ip_refill_seconds = ip_refill_seconds
+        self.email_capacity = email_capacity
+        self.email_refill_seconds = email_refill_seconds
+        self.allowed = 0
+        self.rejected_ip = 0
+        self.rejected_email = 0
+        self.__lock = threading.Lock()
+
+    def check(self, ip, email):
+        retry_after = self.store.take(
+            'ip:{}'.format(ip), self.ip_capacity, self.ip_refill_seconds)
+
+        if retry_after:
+            with self.__lock:
+                self.rejected_ip += 1
+            raise LoginThrottled(retry_after)
+
+        if email:
+            retry_after = self.store.take(
+                'email:{}'.format(email),
+                self.email_capacity,
+                self.email_refill_seconds)
+
+            if retry_after:
+                with self.__lock:
+                    self.rejected_email += 1
+                raise LoginThrottled(retry_after)
+
+        with self.__lock:
+            self.allowed += 1
+
+    def stats(self):
+        rejected = self.rejected_ip + self.rejected_email
+
+        return {
+            'allowed': self.allowed,
+            'rejected_ip': self.rejected_ip,
+            'rejected_email': self.rejected_email,
+            'hashing_seconds_saved': round(
+                rejected * get_hashing_executor().average_seconds(), 3),
+        }
+
+
+def get_login_throttle():
+    throttle = current_app.extensions.get('login_throttle')
+
+    if throttle is None:
+        config = current_app.config
+        store = import_string(config.get('LOGIN_THROTTLE_STORE'))()
+        throttle = LoginThrottle(
+            store,
+            ip_capacity=config.get('LOGIN_THROTTLE_IP_CAPACITY'),
+            ip_refill_seconds=config.get('LOGIN_THROTTLE_IP_REFILL_SECONDS'),
+            email_capacity=config.get('LOGIN_THROTTLE_EMAIL_CAPACITY'),
+            email_refill_seconds=config.get(
+                'LOGIN_THROTTLE_EMAIL_REFILL_SECONDS'))
+        current_app.extensions['login_throttle'] = throttle
+
+    return throttle
+
+
+def throttle_login(ip, email):
+    if not current_app.config.get('LOGIN_THROTTLE_ENABLED'):
+        return
+
+    if isinstance(email, str):
+        email = email.lower()
+    else:
+        email = None
+
+    get_login_throttle().check(ip, email)
@@ -33,3 +33,10 @@ class LoginValidator(BaseValidator):
             'email': [rules.Required()],
             'password': [rules.Required()]
         }
+
+
+class RefreshValidator(BaseValidator):
+    def get_rules(self):
+        return {
+            'refresh_token': [rules.String(), rules.Required()]
+        }
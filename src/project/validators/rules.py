@@ -24,6 +24,23 @@ class Required:
             raise ValidationRuleException(self.__get_message(field))
 
 
+class String:
+    def __init__(self, message=None):
+        self.message = message
+
+    def __get_message(self, field):
+        cleaned_field = field.replace('_', ' ')
+
+        if self.message is None:
+            return '{} must be a string.'.format(cleaned_field)
+
+        return self.message.format(cleaned_field)
+
+    def validate(self, field, data):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValidationRuleException(self.__get_message(field))
+
+
 class Length:
     def __init__(self, min=-1, max=None, message=None):
         self.min = min
@@ -0,0 +1,34 @@
+import datetime
+
+from project import db
+from project.models import ChangeCounter, User
+
+
+def counter_versions(*names):
+    """Returns the versions of the change counters of names, in order.
+
+    The counters are bumped by triggers on their tables and created on the
+    first write, so a missing counter reads as version 0.
+    """
+    versions = dict(db.session.query(
+        ChangeCounter.name, ChangeCounter.version
+    ).filter(ChangeCounter.name.in_(names)))
+
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def user_version(user_id):
+    """Returns what a serialized user depends on, or None for a missing one.
+
+    The effective status depends on today's date, so it is part of the
+    version too. The id is, so that endpoints answering about the caller
+    under a single url never share an ETag between two users.
+    """
+    row = db.session.query(
+        User.id, User.created, User.updated, User.permissions_version
+    ).filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+
+    return tuple(row) + (datetime.date.today(),)
@@ -1,7 +1,11 @@
 from flask import Blueprint, request, current_app
-from project.auth import authenticate
-from project.logics import AuthLogics, NotFound
-from project.views.utils import success_response, failed_response
+from project.auth import authenticate, forbidden
+from project.keys import get_jwks
+from project.throttling import throttle_login
+from project.logics import AuthLogics, NotFound, Unauthorized
+from project.versions import user_version
+from project.views.utils import (
+    success_response, failed_response, conditional, client_ip)
 from project.validators.exceptions import ValidatorException
 
 
@@ -11,6 +15,8 @@ auth_blueprint = Blueprint('auth', __name__)
 @auth_blueprint.route('/auth/login', methods=['POST'])
 def login():
     user_data = request.get_json()
+    email = user_data.get('email') if isinstance(user_data, dict) else None
+    throttle_login(client_ip(), email)
 
     try:
         token = AuthLogics().login(user_data)
@@ -24,6 +30,20 @@ def login():
         return failed_response('invalid payload.', 400, e.errors)
 
 
+@auth_blueprint.route('/auth/refresh', methods=['POST'])
+def refresh():
+    data = request.get_json()
+
+    try:
+        tokens = AuthLogics().refresh(data)
+        return success_response(data=tokens, status_code=200)
+    except Unauthorized:
+        return failed_response(
+            message='invalid refresh token.', status_code=401)
+    except ValidatorException as e:
+        return failed_response('invalid payload.', 400, e.errors)
+
+
 @auth_blueprint.route('/auth/logout', methods=['GET'])
 @authenticate
 def logout(user):
@@ -32,11 +52,36 @@ def logout(user):
 
 @auth_blueprint.route('/auth/status', methods=['GET'])
 @authenticate
+@conditional(lambda user: user_version(user.id))
 def status(user):
     user = AuthLogics().get_status(user)
     return success_response(data=user, status_code=200)
 
 
+@auth_blueprint.route('/auth/authorize', methods=['POST'])
+@authenticate
+def authorize(user):
+    if user.admin is not True:
+        return forbidden()
+
+    checks = request.get_json()
+
+    try:
+        results = AuthLogics().authorize(checks)
+        return success_response(data=results, status_code=200)
+    except ValidatorException as e:
+        return failed_response('invalid payload.', 400, e.errors)
+
+
+@auth_blueprint.route('/auth/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    response, status_code = success_response(data=get_jwks(), status_code=200)
+    response.headers['Cache-Control'] = 'public, max-age={}'.format(
+        current_app.config.get('JWKS_MAX_AGE_SECONDS'))
+
+    return response, status_code
+
+
 @auth_blueprint.route('/auth/recover-password', methods=['POST'])
 def recover_password():
     try:
@@ -1,12 +1,17 @@
 from flask import Blueprint, request
 from project.logics import GroupLogics
-from project.views.utils import success_response
+from project.validators.exceptions import ValidatorException
+from project.versions import counter_versions
+from project.views.utils import (
+    success_response, failed_response, page_headers, stream_response,
+    wants_stream, conditional)
 
 
 groups_blueprint = Blueprint('groups', __name__)
 
 
 @groups_blueprint.route('/auth/groups', methods=['GET'])
+@conditional(lambda: counter_versions('groups'))
 def list():
     groups = GroupLogics().list()
     return success_response(
@@ -44,11 +49,19 @@ def delete(id):
 
 @groups_blueprint.route('/auth/groups/<id>/users', methods=['GET'])
 def users(id):
-    users = GroupLogics().users(id)
+    try:
+        if wants_stream():
+            return stream_response(
+                GroupLogics().stream_users(id, request.args))
+
+        users, next_cursor = GroupLogics().users(id, request.args)
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
 
     return success_response(
         data=users,
-        status_code=200)
+        status_code=200,
+        headers=page_headers(next_cursor))
 
 
 @groups_blueprint.route('/auth/groups/<id>/users', methods=['POST'])
@@ -73,6 +86,7 @@ def delete_user(id, user_id):
 
 
 @groups_blueprint.route('/auth/groups/<id>/permissions', methods=['GET'])
+@conditional(lambda id: counter_versions('group_permissions', 'permissions'))
 def permissions(id):
     permissions = GroupLogics().permissions(id)
 
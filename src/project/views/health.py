@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app
+from project.auth import authenticate, forbidden
+from project.encoders import jsonify
 
 
 health_blueprint = Blueprint('health', __name__)
@@ -9,3 +11,16 @@ def health():
     return jsonify({
         'message': 'healthy'
     })
+
+
+@health_blueprint.route('/users-service/metrics', methods=['GET'])
+@authenticate
+def metrics(user):
+    if user.admin is not True:
+        return forbidden()
+
+    return jsonify({
+        name: extension.stats()
+        for name, extension in current_app.extensions.items()
+        if hasattr(extension, 'stats')
+    })
@@ -1,12 +1,14 @@
 from flask import Blueprint
 from project.logics import PermissionLogics
-from project.views.utils import success_response
+from project.versions import counter_versions
+from project.views.utils import success_response, conditional
 
 
 permissions_blueprint = Blueprint('permissions', __name__)
 
 
 @permissions_blueprint.route('/auth/permissions', methods=['GET'])
+@conditional(lambda: counter_versions('permissions'))
 def list():
     permissions = PermissionLogics().list()
     return success_response(
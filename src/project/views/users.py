@@ -3,7 +3,10 @@ from sqlalchemy import exc
 from project.auth import authorize, authenticate
 from project.logics import UserLogics, NotFound, Unauthorized
 from project.validators.exceptions import ValidatorException
-from project.views.utils import success_response, failed_response
+from project.versions import user_version
+from project.views.utils import (
+    success_response, failed_response, page_headers, stream_response,
+    wants_stream, conditional)
 
 
 users_blueprint = Blueprint('users', __name__)
@@ -12,10 +15,17 @@ users_blueprint = Blueprint('users', __name__)
 @users_blueprint.route('/users', methods=['GET'])
 @authorize(['LIST_USERS'])
 def list(user):
-    users = UserLogics().list()
-    return success_response(
-        data=users,
-        status_code=200)
+    try:
+        if wants_stream():
+            return stream_response(UserLogics().stream(request.args))
+
+        users, next_cursor = UserLogics().list(request.args)
+        return success_response(
+            data=users,
+            status_code=200,
+            headers=page_headers(next_cursor))
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
 
 
 @users_blueprint.route('/users/admins', methods=['GET'])
@@ -24,22 +34,44 @@ def admins(user):
     if user.admin is not True:
         return failed_response(message='unauthorized', status_code=401)
 
-    users = UserLogics().list_admins()
-    return success_response(
-        data=users,
-        status_code=200)
+    try:
+        if wants_stream():
+            return stream_response(UserLogics().stream_admins(request.args))
+
+        users, next_cursor = UserLogics().list_admins(request.args)
+        return success_response(
+            data=users,
+            status_code=200,
+            headers=page_headers(next_cursor))
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
+
+
+@users_blueprint.route('/users/search', methods=['GET'])
+@authorize(['LIST_USERS'])
+def search(user):
+    try:
+        users = UserLogics().search(request.args)
+        return success_response(
+            data=users,
+            status_code=200)
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
 
 
 @users_blueprint.route('/users/<id>', methods=['GET'])
 @authorize(['LIST_USERS'])
+@conditional(lambda user, id: user_version(id))
 def get(user, id):
     try:
-        user = UserLogics().get(id)
+        user = UserLogics().get(id, request.args)
         return success_response(
             data=user,
             status_code=200)
     except NotFound:
         return failed_response(message='not found.', status_code=404)
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
 
 
 @users_blueprint.route('/users', methods=['POST'])
@@ -110,10 +142,25 @@ def activate(user, id):
 @users_blueprint.route('/users/byIds/<ids>', methods=['GET'])
 @authenticate
 def filter_by_ids(user, ids):
-    users = UserLogics().filter_by_ids(ids.split(','))
-    return success_response(
-        data=users,
-        status_code=200)
+    try:
+        users = UserLogics().filter_by_ids(ids.split(','), request.args)
+        return success_response(
+            data=users,
+            status_code=200)
+    except ValidatorException as e:
+        return failed_response('invalid parameters.', 400, e.errors)
+
+
+@users_blueprint.route('/users/lookup', methods=['POST'])
+@authenticate
+def lookup(user):
+    try:
+        users = UserLogics().lookup(request.get_json(), request.args)
+        return success_response(
+            data=users,
+            status_code=200)
+    except ValidatorException as e:
+        return failed_response('invalid payload.', 400, e.errors)
 
 
 @users_blueprint.route('/users/<id>/password', methods=['PUT'])
@@ -1,12 +1,145 @@
-from flask import jsonify
+import hashlib
+from functools import wraps
 
+from flask import (
+    Response, current_app, make_response, request, stream_with_context)
+
+from project.compression import encoded_etags
+from project.encoders import get_json_encoder, jsonify
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def success_response(data=None, status_code=200, headers=None):
+    if headers:
+        return jsonify(data), status_code, headers
 
-def success_response(data=None, status_code=200):
     return jsonify(data), status_code
 
 
+def page_headers(next_cursor):
+    if next_cursor is None:
+        return None
+
+    return {'X-Next-Cursor': next_cursor}
+
+
 def failed_response(message, status_code, data=None):
     return jsonify({
         'message': message,
         'data': data
     }), status_code
+
+
+def client_ip():
+    """Address of the client behind TRUSTED_PROXY_COUNT proxies.
+
+    Every proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is that many entries from the right.
+    Entries further left come from the client itself and are ignored.
+    """
+    count = current_app.config.get('TRUSTED_PROXY_COUNT')
+    forwarded = [
+        address.strip()
+        for address in request.headers.get('X-Forwarded-For', '').split(',')
+        if address.strip()]
+
+    if count and len(forwarded) >= count:
+        return forwarded[-count]
+
+    return request.remote_addr
+
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(
+        ['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def wants_stream():
+    return request.args.get('stream') == 'true' or wants_ndjson()
+
+
+def stream_response(items, status_code=200):
+    """Streams items as NDJSON or as a JSON array, flushing every
+    USERS_STREAM_CHUNK_SIZE items."""
+    ndjson = wants_ndjson()
+    encoder = get_json_encoder()
+    chunk_size = current_app.config.get('USERS_STREAM_CHUNK_SIZE')
+
+    def encode(chunk, first):
+        if ndjson:
+            return b''.join(item + b'\n' for item in chunk)
+
+        return (b'' if first else b',') + b','.join(chunk)
+
+    def generate():
+        if not ndjson:
+            yield b'['
+
+        chunk = []
+        first = True
+
+        for item in items:
+            chunk.append(encoder.dumps(item))
+
+            if len(chunk) == chunk_size:
+                yield encode(chunk, first)
+                chunk = []
+                first = False
+
+        if chunk:
+            yield encode(chunk, first)
+
+        if not ndjson:
+            yield b']'
+
+    return Response(
+        stream_with_context(generate()),
+        status=status_code,
+        mimetype=NDJSON_MIMETYPE if ndjson else 'application/json')
+
+
+def make_etag(version):
+    """Strong ETag of the requested url at a version stamp."""
+    key = repr((request.full_path, version)).encode()
+
+    return hashlib.sha1(key).hexdigest()
+
+
+def conditional(version):
+    """Tags responses with an ETag derived from version(*args, **kwargs).
+
+    A request whose If-None-Match holds the current ETag, or the one of a
+    compressed representation, is answered with a 304 before the view runs,
+    so the payload is never built. A None version skips the check, letting
+    the view answer as usual.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            stamp = version(*args, **kwargs)
+
+            if stamp is None:
+                return f(*args, **kwargs)
+
+            etag = make_etag(stamp)
+            matches = [
+                tag for tag in encoded_etags(etag)
+                if request.if_none_match.contains(tag)]
+
+            if matches:
+                response = current_app.response_class(status=304)
+                response.set_etag(matches[0])
+                if current_app.config.get('COMPRESSION_ENABLED'):
+                    response.vary.add('Accept-Encoding')
+                return response
+
+            response = make_response(f(*args, **kwargs))
+
+            if response.status_code == 200:
+                response.set_etag(etag)
+
+            return response
+        return decorated_function
+    return decorator